@@ -8,10 +8,26 @@ import streamlit as st
 import requests
 import pandas as pd
 import base64
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-from io import StringIO
+import contextlib
+import contextvars
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import queue
+import random
+import sys
+import threading
 import time
+import uuid
 
 # =============================================================================
 # AUTHENTICATION
@@ -46,6 +62,109 @@ APP_NAME = "Dataset Copy Tool"
 PROD_INSTANCE = "keshet-tv"
 DEV_INSTANCE = "keshet-tv-dev"
 
+# Local state (dataset catalog etc.) lives next to the app
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CATALOG_DB_PATH = os.path.join(CACHE_DIR, "catalog.sqlite")
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+# Checkpoints (and their open stream executions) are dropped once idle this long when a
+# copy with another filter into the same target starts, and unconditionally after the max age
+CHECKPOINT_SUPERSEDED_SECONDS = 15 * 60
+CHECKPOINT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# Local Parquet cache of source extracts (needs pyarrow): disk budget, LRU-evicted,
+# and rows per chunk when replaying an entry
+EXTRACT_CACHE_DIR = os.path.join(CACHE_DIR, "extracts")
+EXTRACT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+EXTRACT_CACHE_BATCH_ROWS = 100000
+
+# Full catalog rescan interval; in between, only changed datasets are pulled
+CATALOG_TTL_SECONDS = 24 * 60 * 60
+
+# Max keep-alive connections kept open per instance
+HTTP_POOL_SIZE = 16
+
+# Max concurrent query/upload requests per instance (DEFAULT for unlisted ones)
+INSTANCE_MAX_CONCURRENCY = {
+    PROD_INSTANCE: 4,
+    DEV_INSTANCE: 4,
+}
+DEFAULT_MAX_CONCURRENCY = 2
+
+# Gzip-encode Stream API part bodies (falls back to plain CSV if an endpoint rejects it)
+UPLOAD_GZIP = True
+# Also gzip-encode whole-dataset /data PUTs; off by default, since not every endpoint accepts it
+DATA_UPLOAD_GZIP = False
+GZIP_COMPRESSLEVEL = 6
+
+# Rows parsed per step when reading a streamed CSV export
+EXPORT_CSV_CHUNK_ROWS = 20000
+
+# Retries of throttled (429), failed (5xx) or dropped requests, with jittered
+# exponential backoff; a longer Retry-After from the server is honoured up to the cap
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 60.0
+
+# Admission control shared by all sessions: max requests and estimated bytes
+# (request bodies plus expected query responses) in flight per instance
+ADMISSION_MAX_REQUESTS = {
+    PROD_INSTANCE: 8,
+    DEV_INSTANCE: 8,
+}
+DEFAULT_ADMISSION_MAX_REQUESTS = 4
+ADMISSION_MAX_BYTES = 256 * 1024 * 1024
+
+# Client-side request rate limit per instance (token bucket refill rate and burst size)
+INSTANCE_REQUESTS_PER_SECOND = {
+    PROD_INSTANCE: 10,
+    DEV_INSTANCE: 10,
+}
+DEFAULT_REQUESTS_PER_SECOND = 5
+REQUEST_BURST = 10
+
+# Adaptive chunk sizing: aim each query/part at this response size and latency
+CHUNK_TARGET_BYTES = 48 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 45
+CHUNK_MIN_ROWS = 5000
+CHUNK_MAX_ROWS = 500000
+
+# Rough JSON bytes per value by DOMO column type, for the first chunk's size
+COLUMN_WIDTH_ESTIMATES = {
+    'LONG': 12,
+    'DOUBLE': 20,
+    'DECIMAL': 20,
+    'DATE': 14,
+    'DATETIME': 24,
+    'STRING': 32,
+}
+
+# Upper bound on rows per date-range partition of a filtered extract
+PARTITION_MAX_ROWS = 500000
+
+# Dataset catalog listing: /v1/datasets caps page size at 50, so fetch pages in parallel
+DATASET_LIST_PAGE_SIZE = 50
+DATASET_LIST_CONCURRENCY = 8
+
+# Stream listing page size (API maximum) and minimum index age before a miss rebuilds it
+STREAM_LIST_PAGE_SIZE = 500
+STREAM_INDEX_MIN_AGE_SECONDS = 60
+
+# Headless batch runs: max copies in flight per instance
+BATCH_MAX_CONCURRENT_COPIES = {
+    PROD_INSTANCE: 3,
+    DEV_INSTANCE: 3,
+}
+
+# Copies started from the page run on this many background worker threads
+BACKGROUND_JOB_WORKERS = 4
+# Pages refresh a running job's progress this often
+JOB_POLL_SECONDS = 1
+# Finished jobs are kept this long for pages to pick up
+JOB_RETENTION_SECONDS = 6 * 60 * 60
+
+# Refresh cached OAuth tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 120
+
 # =============================================================================
 # STYLING
 # =============================================================================
@@ -439,8 +558,8 @@ def apply_custom_css():
 # OAUTH AUTHENTICATION
 # =============================================================================
 
-def get_oauth_token(instance: str) -> Optional[str]:
-    """Get OAuth access token for an instance."""
+def _request_oauth_token(instance: str) -> Tuple[str, int]:
+    """Request a new OAuth access token. Returns (token, expires_in seconds)."""
     if instance == PROD_INSTANCE:
         client_id = st.secrets["domo"]["prod_client_id"]
         client_secret = st.secrets["domo"]["prod_client_secret"]
@@ -466,70 +585,918 @@ def get_oauth_token(instance: str) -> Optional[str]:
     response = requests.post(auth_url, headers=headers, data=data, timeout=30)
     
     if response.status_code == 200:
-        return response.json().get('access_token')
+        payload = response.json()
+        return payload.get('access_token'), int(payload.get('expires_in') or 3600)
     else:
         raise Exception(f"OAuth authentication failed: {response.text}")
 
 
-def get_oauth_headers(token: str) -> Dict[str, str]:
-    """Get headers with OAuth token."""
-    return {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+class TokenCache:
+    """Thread-safe per-instance cache of OAuth tokens that honors expires_in."""
+    
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN_SECONDS):
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+    
+    def _lock_for(self, instance: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(instance, threading.Lock())
+    
+    def _valid_token(self, instance: str) -> Optional[str]:
+        cached = self._tokens.get(instance)
+        if cached and time.monotonic() < cached[1] - self.refresh_margin:
+            return cached[0]
+        return None
+    
+    def get(self, instance: str) -> str:
+        token = self._valid_token(instance)
+        if token:
+            return token
+        # One refresh per instance at a time; other threads wait and reuse it
+        with self._lock_for(instance):
+            token = self._valid_token(instance)
+            if token:
+                return token
+            token, expires_in = _request_oauth_token(instance)
+            self._tokens[instance] = (token, time.monotonic() + expires_in)
+            return token
+    
+    def invalidate(self, instance: str):
+        with self._lock_for(instance):
+            self._tokens.pop(instance, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_token_cache() -> TokenCache:
+    """Process-wide token cache shared by all sessions and reruns."""
+    return TokenCache()
+
+
+def get_oauth_token(instance: str) -> Optional[str]:
+    """Get OAuth access token for an instance (cached until shortly before expiry)."""
+    return get_token_cache().get(instance)
+
+
+# =============================================================================
+# HTTP SESSIONS
+# =============================================================================
+
+class DomoAuth(requests.auth.AuthBase):
+    """Attach the cached OAuth bearer token of an instance to every request."""
+    
+    def __init__(self, instance: str):
+        self.instance = instance
+    
+    def __call__(self, request):
+        request.headers['Authorization'] = f'Bearer {get_oauth_token(self.instance)}'
+        return request
+
+
+# Who a request is made for (a browser session or batch entry), for fair admission
+_request_owner = contextvars.ContextVar('request_owner', default='')
+
+
+def set_request_owner(owner: str):
+    """Attribute requests made from the current thread/context to owner."""
+    _request_owner.set(owner)
+
+
+def submit_in_context(executor: ThreadPoolExecutor, fn, *args, **kwargs):
+    """executor.submit() that carries the caller's request owner into the worker."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def current_session_id() -> str:
+    """Id of the Streamlit session running this script, or '' outside one."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ''
+
+
+class AdmissionController:
+    """
+    Process-wide cap on requests and bytes in flight against one instance.
+    
+    Waiting requests are queued per owner and admitted round-robin across
+    owners, so one session's big copy cannot starve everyone else. A request
+    larger than max_bytes counts as exactly max_bytes, so it waits only for the
+    bytes in flight to drain rather than for every other request to finish.
+    """
+    
+    def __init__(self, max_requests: int, max_bytes: int = ADMISSION_MAX_BYTES):
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.active = 0
+        self.bytes_in_flight = 0
+        self._waiting: Dict[str, deque] = {}
+        self._turns = deque()  # Owners with waiting requests, in the order they are served
+        self._cond = threading.Condition()
+    
+    def _admissible(self, owner: str, ticket, nbytes: int) -> bool:
+        if self._turns[0] != owner or self._waiting[owner][0] is not ticket:
+            return False
+        if self.active >= self.max_requests:
+            return False
+        return self.bytes_in_flight + nbytes <= self.max_bytes
+    
+    def weight(self, nbytes: int) -> int:
+        """Bytes a request counts for: its size, at most max_bytes."""
+        return min(nbytes, self.max_bytes)
+    
+    def acquire(self, owner: str, nbytes: int = 0):
+        """Block until it is owner's turn and the request fits, then count it as in flight."""
+        nbytes = self.weight(nbytes)
+        ticket = object()
+        with self._cond:
+            if owner not in self._waiting:
+                self._waiting[owner] = deque()
+                self._turns.append(owner)
+            self._waiting[owner].append(ticket)
+            while not self._admissible(owner, ticket, nbytes):
+                self._cond.wait()
+            
+            # Move this owner to the back of the line (or out of it)
+            self._waiting[owner].popleft()
+            self._turns.popleft()
+            if self._waiting[owner]:
+                self._turns.append(owner)
+            else:
+                del self._waiting[owner]
+            self.active += 1
+            self.bytes_in_flight += nbytes
+            self._cond.notify_all()
+    
+    def release(self, nbytes: int = 0):
+        with self._cond:
+            self.active -= 1
+            self.bytes_in_flight -= self.weight(nbytes)
+            self._cond.notify_all()
+    
+    def queue_position(self, owner: str) -> Optional[int]:
+        """1-based turn of owner's next waiting request, or None if it is not waiting."""
+        with self._cond:
+            if owner not in self._waiting:
+                return None
+            return list(self._turns).index(owner) + 1
+
+
+@st.cache_resource(show_spinner=False)
+def get_admission_controller(instance: str) -> AdmissionController:
+    return AdmissionController(ADMISSION_MAX_REQUESTS.get(instance, DEFAULT_ADMISSION_MAX_REQUESTS))
+
+
+def body_size(body) -> int:
+    """Size in bytes of a request body (bytes or a file), 0 if unknown."""
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    try:
+        return os.fstat(body.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+class TokenBucket:
+    """Client-side rate limiter shared by every thread talking to one instance."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """Take one token, waiting for it if needed. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+    
+    def pause(self, seconds: float):
+        """Hold back every request for a while (e.g. after the server answered 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RequestMetrics:
+    """Thread-safe request, retry and throttling counters of one instance's session."""
+    
+    FIELDS = ('requests', 'retries', 'throttled', 'server_errors', 'connection_errors', 'gave_up')
+    
+    def __init__(self):
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._wait_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+    
+    def add_wait(self, seconds: float):
+        if seconds:
+            with self._lock:
+                self._wait_seconds += seconds
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {**self._counts, 'wait_seconds': round(self._wait_seconds, 1)}
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff before retry number attempt, at least retry_after."""
+    backoff = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+    return min(max(backoff, retry_after or 0), RETRY_MAX_DELAY_SECONDS)
+
+
+def parse_retry_after(response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), if any."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retry_safe(method: str, url: str) -> bool:
+    """Whether a request may be repeated after a 5xx or dropped connection."""
+    # Queries are read-only POSTs; other POSTs create things and must not run twice
+    return method.upper() in ('GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE') or '/query/execute/' in url
+
+
+class DomoSession(requests.Session):
+    """
+    Keep-alive session with a dedicated connection pool for one DOMO instance.
+    
+    Every request first takes a token from the instance's rate limiter and is then
+    admitted by the instance's shared AdmissionController (pass expected_bytes= to
+    account for a large response), so no admission slot is held while rate-limited. 429s are
+    retried (pausing the whole instance for the backoff or Retry-After), and 5xx
+    responses and dropped connections are retried for idempotent calls and
+    queries. Counts are kept in metrics.
+    """
+    
+    def __init__(self, instance: str, pool_size: int = HTTP_POOL_SIZE):
+        super().__init__()
+        self.instance = instance
+        self.auth = DomoAuth(instance)
+        self.headers['Connection'] = 'keep-alive'
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        rate = INSTANCE_REQUESTS_PER_SECOND.get(instance, DEFAULT_REQUESTS_PER_SECOND)
+        self.throttle = TokenBucket(rate, REQUEST_BURST)
+        self.admission = get_admission_controller(instance)
+        self.metrics = RequestMetrics()
+    
+    def request(self, method, url, *args, expected_bytes: int = 0, **kwargs):
+        # File bodies can only be sent again if they can be rewound
+        body = kwargs.get('data')
+        nbytes = body_size(body) + expected_bytes
+        body_start = None
+        if hasattr(body, 'read'):
+            body_start = body.tell() if hasattr(body, 'seek') and hasattr(body, 'tell') else None
+        replayable = not hasattr(body, 'read') or body_start is not None
+        retry_safe = replayable and is_retry_safe(method, url)
+        token_refreshed = False
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            self.metrics.add('requests')
+            if body_start is not None:
+                body.seek(body_start)
+            
+            waited = time.monotonic()
+            connection_error = None
+            self.throttle.acquire()
+            self.admission.acquire(_request_owner.get(), nbytes)
+            try:
+                self.metrics.add_wait(time.monotonic() - waited)
+                response = super().request(method, url, *args, **kwargs)
+            except requests.ConnectionError as e:
+                connection_error = e
+            finally:
+                self.admission.release(nbytes)
+            
+            if connection_error is not None:
+                if not retry_safe:
+                    raise connection_error
+                if attempt >= RETRY_MAX_ATTEMPTS:
+                    self.metrics.add('gave_up')
+                    raise connection_error
+                self.metrics.add('connection_errors')
+                self.metrics.add('retries')
+                time.sleep(retry_delay(attempt))
+                continue
+            
+            status = response.status_code
+            if status == 401 and replayable and not token_refreshed:
+                # Token was revoked or expired early; fetch a fresh one and retry once
+                token_refreshed = True
+                get_token_cache().invalidate(self.instance)
+                response.close()
+                continue
+            
+            throttled = status == 429 and replayable
+            if throttled or (status >= 500 and retry_safe):
+                if attempt >= RETRY_MAX_ATTEMPTS:
+                    self.metrics.add('gave_up')
+                    return response
+                delay = retry_delay(attempt, parse_retry_after(response))
+                self.metrics.add('throttled' if throttled else 'server_errors')
+                self.metrics.add('retries')
+                response.close()
+                if throttled:
+                    # Back the whole instance off, not just this thread
+                    self.throttle.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+            
+            return response
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_session(instance: str) -> DomoSession:
+    """Process-wide pooled session for an instance, reused across chunks and parts."""
+    return DomoSession(instance)
+
+
+def get_request_metrics() -> Dict[str, Dict]:
+    """Request/retry counters of each instance's session since the process started."""
+    return {instance: get_http_session(instance).metrics.snapshot() for instance in (PROD_INSTANCE, DEV_INSTANCE)}
 
 
 # =============================================================================
 # DOMO API FUNCTIONS
 # =============================================================================
 
-@st.cache_data(show_spinner=False)
-def list_datasets(instance: str) -> List[Dict]:
-    """List all datasets from a DOMO instance."""
-    token = get_oauth_token(instance)
+def fetch_all_pages(instance: str, url: str, limit: int, max_workers: int = DATASET_LIST_CONCURRENCY) -> List[Dict]:
+    """GET every page of an offset/limit listing endpoint, several pages in flight at once."""
+    session = get_http_session(instance)
+    
+    def fetch_page(offset):
+        params = {'offset': offset, 'limit': limit}
+        response = session.get(url, params=params, timeout=60)
+        response.raise_for_status()
+        return response.json()
+    
+    # The first page tells us whether there is anything more to fetch
+    items = fetch_page(0)
+    if len(items) < limit:
+        return items
+    
+    # Keep a window of page requests in flight until a short page marks the end
+    next_offset = limit
+    in_flight = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            while len(in_flight) < max_workers:
+                in_flight.append(submit_in_context(executor, fetch_page, next_offset))
+                next_offset += limit
+            
+            batch = in_flight.popleft().result()
+            items.extend(batch)
+            
+            if len(batch) < limit:
+                break
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+    
+    return items
+
+
+def fetch_all_datasets(instance: str) -> List[Dict]:
+    """List all datasets from a DOMO instance, fetching pages concurrently."""
+    return fetch_all_pages(instance, "https://api.domo.com/v1/datasets", DATASET_LIST_PAGE_SIZE)
+
+
+def fetch_datasets_updated_since(instance: str, since: str) -> List[Dict]:
+    """List datasets whose updatedAt is at or after `since`, newest first."""
+    session = get_http_session(instance)
     
     url = "https://api.domo.com/v1/datasets"
-    all_datasets = []
+    limit = DATASET_LIST_PAGE_SIZE
+    changed = []
     offset = 0
-    limit = 50
     
     while True:
-        params = {'offset': offset, 'limit': limit}
-        response = requests.get(url, headers=get_oauth_headers(token), params=params, timeout=60)
+        params = {'offset': offset, 'limit': limit, 'sort': '-lastUpdated'}
+        response = session.get(url, params=params, timeout=60)
         response.raise_for_status()
         
         batch = response.json()
+        fresh = [ds for ds in batch if (ds.get('updatedAt') or '') >= since]
+        changed.extend(fresh)
         
-        if not batch:
+        # Sorted newest first, so the first older dataset ends the scan
+        if len(fresh) < len(batch) or len(batch) < limit:
             break
         
-        all_datasets.extend(batch)
-        
-        if len(batch) < limit:
-            break
-            
         offset += limit
     
-    return all_datasets
+    return changed
+
+
+@st.cache_data(show_spinner=False)
+def list_datasets(instance: str) -> List[Dict]:
+    """List all datasets of an instance from the local catalog, syncing it first."""
+    sync_catalog(instance)
+    return get_dataset_catalog().load(instance)
 
 
 def get_dataset_info(instance: str, dataset_id: str) -> Dict:
     """Get detailed information about a specific dataset."""
-    token = get_oauth_token(instance)
-    
     url = f"https://api.domo.com/v1/datasets/{dataset_id}"
-    response = requests.get(url, headers=get_oauth_headers(token), timeout=60)
+    response = get_http_session(instance).get(url, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_instance_concurrency(instance: str) -> int:
+    """Max number of requests to keep in flight against an instance."""
+    return INSTANCE_MAX_CONCURRENCY.get(instance, DEFAULT_MAX_CONCURRENCY)
+
+
+def execute_query(instance: str, dataset_id: str, sql: str, timeout: int = 300) -> Dict:
+    """Run a SQL query against a dataset and return the JSON result."""
+    url = f"https://api.domo.com/v1/datasets/query/execute/{dataset_id}"
+    response = get_http_session(instance).post(url, json={"sql": sql}, timeout=timeout)
     response.raise_for_status()
     return response.json()
 
 
+def count_rows(instance: str, dataset_id: str, where_clause: str = "") -> int:
+    """Count the rows of a dataset matching an optional 'WHERE ...' clause."""
+    result = execute_query(instance, dataset_id, f"SELECT COUNT(*) AS cnt FROM table {where_clause}", timeout=120)
+    rows = result.get('rows') or [[0]]
+    return int(rows[0][0])
+
+
+def estimate_row_bytes(schema: List[Dict]) -> int:
+    """Estimate the serialized size of one row from the column types."""
+    return 4 + sum(COLUMN_WIDTH_ESTIMATES.get(col.get('type', '').upper(), 24) + 3 for col in schema)
+
+
+class AdaptiveChunkSizer:
+    """
+    Choose the row LIMIT of the next chunk from observed response sizes and latencies.
+    
+    Starts from target_bytes / row_bytes and, after every response, moves toward the
+    row count that would hit both the byte and the latency target. Growth is capped
+    at 2x per observation; shrinking is immediate. Safe to share between threads.
+    """
+    
+    def __init__(self, row_bytes: int = None, initial_rows: int = None,
+                 target_bytes: int = CHUNK_TARGET_BYTES, target_seconds: float = CHUNK_TARGET_SECONDS,
+                 min_rows: int = CHUNK_MIN_ROWS, max_rows: int = CHUNK_MAX_ROWS):
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        if initial_rows is None:
+            initial_rows = target_bytes // max(row_bytes or 1, 1)
+        self._rows = self._clamp(initial_rows)
+        self._row_bytes = row_bytes or target_bytes / self._rows
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def for_schema(cls, schema: List[Dict], **kwargs) -> 'AdaptiveChunkSizer':
+        return cls(row_bytes=estimate_row_bytes(schema), **kwargs)
+    
+    @classmethod
+    def fixed(cls, rows: int) -> 'AdaptiveChunkSizer':
+        return cls(initial_rows=rows, min_rows=rows, max_rows=rows)
+    
+    def _clamp(self, rows) -> int:
+        return int(max(self.min_rows, min(self.max_rows, rows)))
+    
+    def next_size(self) -> int:
+        with self._lock:
+            return self._rows
+    
+    def expected_bytes(self) -> int:
+        """Likely response size of the next chunk, from the latest observed row size."""
+        with self._lock:
+            return int(self._rows * self._row_bytes)
+    
+    def observe(self, rows: int, nbytes: int, seconds: float = None):
+        """Record one response of `rows` rows, `nbytes` bytes that took `seconds`."""
+        if rows <= 0:
+            return
+        proposal = self.target_bytes * rows / max(nbytes, 1)
+        if seconds:
+            proposal = min(proposal, rows * self.target_seconds / max(seconds, 0.001))
+        with self._lock:
+            self._rows = self._clamp(min(proposal, self._rows * 2))
+            self._row_bytes = nbytes / rows
+
+
+def fetch_query_rows(instance: str, dataset_id: str, sql: str,
+                     sizer: AdaptiveChunkSizer = None) -> Tuple[List[str], List[list]]:
+    """Run a chunk query and feed its response size and latency to the sizer."""
+    url = f"https://api.domo.com/v1/datasets/query/execute/{dataset_id}"
+    started = time.monotonic()
+    expected_bytes = sizer.expected_bytes() if sizer else 0
+    response = get_http_session(instance).post(url, json={"sql": sql}, timeout=300, expected_bytes=expected_bytes)
+    response.raise_for_status()
+    result = response.json()
+    rows = result.get('rows', [])
+    if sizer:
+        sizer.observe(len(rows), len(response.content), time.monotonic() - started)
+    return result.get('columns', []), rows
+
+
+def iter_query_chunks(instance: str, dataset_id: str, where_clause: str, total_rows: int,
+                      chunk_size: int = 100000, max_workers: int = None, cancel_check=None,
+                      sizer: AdaptiveChunkSizer = None, resume_from: int = None) -> Iterator[tuple]:
+    """
+    Fetch LIMIT/OFFSET chunks with up to max_workers queries in flight.
+    Each chunk's LIMIT comes from the sizer when given (chunk_size otherwise).
+    Yields (offset, columns, rows, position) strictly in offset order, where
+    position is (0, next_offset); pass next_offset as resume_from to continue later.
+    """
+    max_workers = max_workers or get_instance_concurrency(instance)
+    sizer = sizer or AdaptiveChunkSizer.fixed(chunk_size)
+    next_offset = resume_from or 0
+    in_flight = deque()
+    
+    def fetch(offset, limit):
+        sql = f"SELECT * FROM table {where_clause} LIMIT {limit} OFFSET {offset}"
+        return fetch_query_rows(instance, dataset_id, sql, sizer)
+    
+    def submit_next(executor):
+        nonlocal next_offset
+        if next_offset < total_rows:
+            limit = sizer.next_size()
+            in_flight.append((next_offset, limit, submit_in_context(executor, fetch, next_offset, limit)))
+            next_offset += limit
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for _ in range(max_workers):
+            submit_next(executor)
+        
+        while in_flight:
+            if cancel_check and cancel_check():
+                raise Exception("Operation cancelled by user")
+            
+            offset, limit, future = in_flight.popleft()
+            columns, rows = future.result()
+            
+            if not rows:
+                break
+            
+            yield offset, columns, rows, (0, offset + len(rows))
+            
+            # Fewer rows than requested means we reached the end of the data
+            if len(rows) < limit:
+                break
+            
+            submit_next(executor)
+    finally:
+        for _, _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def sql_literal(value) -> str:
+    """Render a value returned by the query API as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def and_where(where_clause: str, condition: str) -> str:
+    """Add a condition to an optional 'WHERE ...' clause."""
+    if where_clause:
+        return f"{where_clause} AND ({condition})"
+    return f"WHERE {condition}"
+
+
+def iter_keyset_chunks(instance: str, dataset_id: str, where_clause: str, key_column: str,
+                       column_names: List[str], chunk_size: int = 100000, include_nulls: bool = True,
+                       cancel_check=None, sizer: AdaptiveChunkSizer = None, resume_from: Dict = None) -> Iterator[tuple]:
+    """
+    Page through a dataset by seeking on key_column instead of scanning OFFSETs.
+    
+    Each page is `WHERE key > last_seen ORDER BY key LIMIT n`. The rows sharing
+    the last key of a full page are trimmed and that tie group is paged by OFFSET,
+    ordered by every column, so non-unique keys (e.g. dates) are neither skipped
+    nor duplicated. The next page is requested before the current one is yielded,
+    so it overlaps the tie group and the caller's work. Rows with a NULL key are
+    fetched at the end (also ordered by every column) when include_nulls is set.
+    Yields (rows_before, columns, rows, position) like iter_query_chunks. The
+    position is (0, {'key': k}) once every row up to key k has been yielded,
+    (0, {'key': k, 'seen': t}) after the first t rows of key k, or (0, {'nulls': n})
+    inside the NULL pass; pass its second element as resume_from to continue from there.
+    """
+    key = f"`{key_column}`"
+    # Every column breaks ties, so OFFSETs within a group of equal keys are stable
+    tiebreak = ", ".join(f"`{name}`" for name in column_names if name != key_column)
+    sizer = sizer or AdaptiveChunkSizer.fixed(chunk_size)
+    resume_from = resume_from or {}
+    emitted = 0
+    
+    def check_cancelled():
+        if cancel_check and cancel_check():
+            raise Exception("Operation cancelled by user")
+    
+    def fetch(sql):
+        return fetch_query_rows(instance, dataset_id, sql, sizer)
+    
+    def submit_page(after_key):
+        if after_key is None:
+            page_where = and_where(where_clause, f"{key} IS NOT NULL")
+        else:
+            page_where = and_where(where_clause, f"{key} > {sql_literal(after_key)}")
+        limit = sizer.next_size()
+        sql = f"SELECT * FROM table {page_where} ORDER BY {key} LIMIT {limit}"
+        return limit, submit_in_context(executor, fetch, sql)
+    
+    def iter_offset_group(group_where, offset=0):
+        while True:
+            check_cancelled()
+            limit = sizer.next_size()
+            order = f" ORDER BY {tiebreak}" if tiebreak else ""
+            columns, rows = fetch(f"SELECT * FROM table {group_where}{order} LIMIT {limit} OFFSET {offset}")
+            offset += len(rows)
+            if rows:
+                yield columns, rows, offset, len(rows) < limit
+            if len(rows) < limit:
+                return
+    
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = None
+        group = None
+        if 'nulls' not in resume_from:
+            pending = submit_page(resume_from.get('key'))
+            if 'seen' in resume_from:
+                group = (resume_from['key'], resume_from['seen'])
+        
+        while group or pending:
+            if group:
+                # Rest of the tie group, while the page after it is already in flight
+                tail_key, seen = group
+                group_where = and_where(where_clause, f"{key} = {sql_literal(tail_key)}")
+                for columns, rows, seen, complete in iter_offset_group(group_where, seen):
+                    position = {'key': tail_key} if complete else {'key': tail_key, 'seen': seen}
+                    yield emitted, columns, rows, (0, position)
+                    emitted += len(rows)
+                group = None
+            if pending is None:
+                break
+            
+            check_cancelled()
+            limit, future = pending
+            pending = None
+            columns, rows = future.result()
+            if len(rows) < limit:
+                if rows:
+                    yield emitted, columns, rows, (0, {'key': rows[-1][columns.index(key_column)]})
+                    emitted += len(rows)
+                break
+            
+            # Trim the trailing run of the last key; that whole group is paged separately
+            key_idx = columns.index(key_column)
+            tail_key = rows[-1][key_idx]
+            keep = len(rows)
+            while keep > 0 and rows[keep - 1][key_idx] == tail_key:
+                keep -= 1
+            pending = submit_page(tail_key)
+            group = (tail_key, 0)
+            if keep:
+                yield emitted, columns, rows[:keep], (0, {'key': rows[keep - 1][key_idx]})
+                emitted += keep
+            del rows
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if include_nulls:
+        null_where = and_where(where_clause, f"{key} IS NULL")
+        for columns, rows, offset, _ in iter_offset_group(null_where, resume_from.get('nulls', 0)):
+            yield emitted, columns, rows, (0, {'nulls': offset})
+            emitted += len(rows)
+
+
+def plan_date_partitions(instance: str, dataset_id: str, date_column: str, where_clause: str,
+                         chunk_size: int = 100000) -> Tuple[Optional[List[Tuple[str, int]]], Optional[int]]:
+    """
+    Split a date-filtered extract into contiguous day ranges of similar row counts.
+    
+    Probes per-day row density with a single COUNT ... GROUP BY query and returns
+    ([(partition_where_clause, estimated_rows), ...], total_rows), or (None, None)
+    if the probe fails. The first and last partitions stay open-ended within the
+    original filter, so every filtered row falls in exactly one partition.
+    """
+    key = f"`{date_column}`"
+    probe_sql = f"SELECT DATE({key}) AS day, COUNT(*) AS cnt FROM table {where_clause} GROUP BY DATE({key})"
+    try:
+        result = execute_query(instance, dataset_id, probe_sql, timeout=120)
+        days = sorted((str(row[0]), int(row[1])) for row in result.get('rows', []) if row[0] is not None)
+    except Exception:
+        return None, None
+    
+    total_rows = sum(cnt for _, cnt in days)
+    # Aim for a few partitions per worker, but never tiny or oversized ones
+    target_rows = total_rows // (get_instance_concurrency(instance) * 4)
+    target_rows = max(chunk_size, min(target_rows, PARTITION_MAX_ROWS))
+    
+    # Group consecutive days; each group is identified by its first day
+    groups = []
+    for day, cnt in days:
+        if groups and groups[-1][1] + cnt <= target_rows:
+            groups[-1][1] += cnt
+        else:
+            groups.append([day, cnt])
+    
+    if len(groups) <= 1:
+        return [(where_clause, total_rows)], total_rows
+    
+    partitions = []
+    for i, (day, cnt) in enumerate(groups):
+        conditions = []
+        if i > 0:
+            conditions.append(f"{key} >= {sql_literal(day)}")
+        if i < len(groups) - 1:
+            conditions.append(f"{key} < {sql_literal(groups[i + 1][0])}")
+        partitions.append((and_where(where_clause, " AND ".join(conditions)), cnt))
+    return partitions, total_rows
+
+
+def get_column_max(instance: str, dataset_id: str, column: str):
+    """Largest value of a column (e.g. the date watermark of a copy), or None if the dataset is empty."""
+    result = execute_query(instance, dataset_id, f"SELECT MAX(`{column}`) AS max_value FROM table", timeout=120)
+    rows = result.get('rows') or [[None]]
+    return rows[0][0] if rows[0] else None
+
+
+def iter_partitioned_chunks(instance: str, dataset_id: str, partitions: List[Tuple[str, int]],
+                            page_key: str = None, include_nulls: bool = False, chunk_size: int = 100000,
+                            max_workers: int = None, cancel_check=None, sizer: AdaptiveChunkSizer = None,
+                            resume_from: Dict[int, object] = None, column_names: List[str] = None) -> Iterator[tuple]:
+    """
+    Extract partitions concurrently, one worker per partition.
+    Chunks are yielded as they complete, so rows are not globally ordered; each
+    chunk's position is (partition_index, position within that partition).
+    """
+    max_workers = max_workers or get_instance_concurrency(instance)
+    resume_from = resume_from or {}
+    results = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    def extract(index, partition_where, partition_rows):
+        try:
+            chunks = iter_dataset_chunks(
+                instance, dataset_id, partition_where, partition_rows,
+                page_key=page_key, include_nulls=include_nulls, chunk_size=chunk_size,
+                max_workers=1, cancel_check=stop.is_set, sizer=sizer,
+                resume_from={0: resume_from[index]} if index in resume_from else None,
+                column_names=column_names
+            )
+            for _, columns, rows, (_, position) in chunks:
+                put((columns, rows, (index, position)))
+            put(done)
+        except Exception as e:
+            put(e)
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for index, (partition_where, partition_rows) in enumerate(partitions):
+            submit_in_context(executor, extract, index, partition_where, partition_rows)
+        
+        emitted = 0
+        remaining = len(partitions)
+        while remaining:
+            if cancel_check and cancel_check():
+                raise Exception("Operation cancelled by user")
+            try:
+                item = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                columns, rows, position = item
+                yield emitted, columns, rows, position
+                emitted += len(rows)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_dataset_chunks(instance: str, dataset_id: str, where_clause: str, total_rows: int,
+                        page_key: str = None, include_nulls: bool = True, chunk_size: int = 100000,
+                        max_workers: int = None, cancel_check=None,
+                        partitions: List[Tuple[str, int]] = None,
+                        sizer: AdaptiveChunkSizer = None,
+                        resume_from: Dict[int, object] = None,
+                        column_names: List[str] = None) -> Iterator[tuple]:
+    """
+    Page through a dataset by keyset on page_key, or by concurrent OFFSETs when no key is available.
+    With several date partitions (see plan_date_partitions) they are extracted in parallel instead.
+    
+    Yields (offset, columns, rows, (lane, position)). A lane is a partition index
+    (always 0 without partitions); resume_from maps lanes to the last position a
+    previous run got through, and extraction continues after it. Keyset paging
+    needs the dataset's column_names to order rows that share a key.
+    """
+    resume_from = resume_from or {}
+    if partitions and len(partitions) > 1:
+        return iter_partitioned_chunks(
+            instance, dataset_id, partitions, page_key=page_key, include_nulls=include_nulls,
+            chunk_size=chunk_size, max_workers=max_workers, cancel_check=cancel_check, sizer=sizer,
+            resume_from=resume_from, column_names=column_names
+        )
+    if page_key:
+        return iter_keyset_chunks(
+            instance, dataset_id, where_clause, page_key, column_names,
+            chunk_size=chunk_size, include_nulls=include_nulls, cancel_check=cancel_check, sizer=sizer,
+            resume_from=resume_from.get(0)
+        )
+    return iter_query_chunks(
+        instance, dataset_id, where_clause, total_rows,
+        chunk_size=chunk_size, max_workers=max_workers, cancel_check=cancel_check, sizer=sizer,
+        resume_from=resume_from.get(0)
+    )
+
+
+def iter_kept_target_chunks(instance: str, dataset_id: str, keep_where: str, total_rows: int,
+                            column_names: List[str], page_key: str = None, cancel_check=None, sizer: AdaptiveChunkSizer = None,
+                            lane: int = -1, resume_from=None) -> Iterator[tuple]:
+    """
+    Page through the target rows matching keep_where (NULL page keys included), with
+    each row reordered to column_names so the chunks can share a stream with the source's.
+    
+    Yields (offset, columns, rows, (lane, position)) like iter_dataset_chunks, all in
+    the given lane; resume_from is that lane's last position from a previous run.
+    """
+    chunks = iter_dataset_chunks(
+        instance, dataset_id, keep_where, total_rows,
+        page_key=page_key, include_nulls=True, cancel_check=cancel_check, sizer=sizer,
+        resume_from={0: resume_from} if resume_from is not None else None,
+        column_names=column_names
+    )
+    try:
+        for offset, columns, rows, (_, position) in chunks:
+            missing = [name for name in column_names if name not in columns]
+            if missing:
+                raise Exception(f"Target dataset is missing columns {', '.join(missing)}; run a full copy instead")
+            order = [columns.index(name) for name in column_names]
+            yield offset, column_names, [[row[i] for i in order] for row in rows], (lane, position)
+    finally:
+        chunks.close()
+
+
 def export_dataset_data(instance: str, dataset_id: str, date_column: str = None, 
-                         start_date=None, end_date=None, progress_callback=None) -> pd.DataFrame:
+                         start_date=None, end_date=None, progress_callback=None,
+                         page_key: str = None, cancel_check=None, status_callback=None) -> pd.DataFrame:
     """Export dataset data as DataFrame with support for large datasets.
     
     For large datasets, applies date filter server-side via SQL to reduce data transfer.
+    Pages by keyset on page_key (default: the date column), falling back to OFFSET.
+    Query extracts are cached locally (see ExtractCache); columns are converted to the
+    schema's types (see schema_dtypes) so cached and fresh extracts come out the same.
+    cancel_check is polled between chunks; status_callback(message) reports problems worked around.
     """
-    token = get_oauth_token(instance)
+    session = get_http_session(instance)
     
     # First get dataset info to know the size
     dataset_info = get_dataset_info(instance, dataset_id)
@@ -545,78 +1512,97 @@ def export_dataset_data(instance: str, dataset_id: str, date_column: str = None,
     # For smaller datasets (under 100k rows) without date filter, use direct export
     if total_rows < 100000 and not where_clause:
         url = f"https://api.domo.com/v1/datasets/{dataset_id}/data"
-        headers = get_oauth_headers(token)
-        headers['Accept'] = 'text/csv'
-        
-        response = requests.get(url, headers=headers, timeout=300)
-        response.raise_for_status()
-        
-        csv_text = response.text
-        
-        # Detect if CSV has headers
-        first_line = csv_text.split('\n')[0] if csv_text else ""
-        first_line_values = first_line.split(',') if first_line else []
-        
-        has_header = len(first_line_values) == len(column_names) and any(
-            val.strip().strip('"') in column_names for val in first_line_values[:3]
-        )
-        
-        if has_header:
-            df = pd.read_csv(StringIO(csv_text))
-        else:
-            df = pd.read_csv(StringIO(csv_text), header=None, names=column_names)
         
+        # Stream the body instead of materializing response.text and copies of it
+        with session.get(url, headers={'Accept': 'text/csv'}, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # urllib3 closes the raw stream once the body is read, which the wrappers below refuse
+            response.raw.auto_close = False
+            body = io.BufferedReader(response.raw, buffer_size=1 << 16)
+            
+            # Detect if CSV has headers by peeking at the first line only
+            head = body.peek(1 << 16)
+            if not head:
+                return pd.DataFrame(columns=column_names)
+            first_line = head.split(b'\n', 1)[0].decode('utf-8', errors='replace')
+            first_line_values = first_line.split(',') if first_line else []
+            
+            has_header = len(first_line_values) == len(column_names) and any(
+                val.strip().strip('"') in column_names for val in first_line_values[:3]
+            )
+            
+            # Parse incrementally so only one chunk of raw text is buffered at a time; the
+            # schema's dtypes keep every chunk's columns the same type
+            reader = pd.read_csv(
+                io.TextIOWrapper(body, encoding='utf-8', newline=''),
+                header=0 if has_header else None,
+                names=None if has_header else column_names,
+                dtype=schema_dtypes(schema),
+                chunksize=EXPORT_CSV_CHUNK_ROWS
+            )
+            df = None
+            for frame in reader:
+                if cancel_check and cancel_check():
+                    raise Exception("Operation cancelled by user")
+                df = frame if df is None else pd.concat([df, frame], ignore_index=True)
+                del frame
+        
+        if df is None:
+            return pd.DataFrame(columns=column_names)
         return df
     
     # For large datasets or when filtering, use SQL query with pagination
     all_data = []
-    chunk_size = 100000  # 100k rows per chunk (reduced for memory efficiency)
-    offset = 0
+    sizer = AdaptiveChunkSizer.for_schema(schema)  # Rows per chunk adapt to response size/latency
     max_rows = 10000000  # Safety limit: 10M rows max
+    page_key = page_key or date_column
+    
+    # A repeat of an unchanged extract is served from the local cache
+    extract_cache = get_extract_cache()
+    cache_key = ExtractCache.key(instance, dataset_id, where_clause, column_names, dataset_info.get('updatedAt'))
+    cached_path = extract_cache.get(cache_key)
+    
+    # Split a date window into parallel partitions; the density probe also counts the rows
+    partitions = None
+    if cached_path:
+        total_rows = extract_cache.row_count(cached_path)
+    elif where_clause:
+        partitions, probed_rows = plan_date_partitions(instance, dataset_id, date_column, where_clause, sizer.next_size())
+        if probed_rows is not None:
+            total_rows = probed_rows
+    
+    # Otherwise, get count of filtered data
+    if partitions is None and not cached_path:
+        try:
+            total_rows = count_rows(instance, dataset_id, where_clause)
+        except (requests.RequestException, ValueError, TypeError) as e:
+            # The unfiltered row count still bounds the OFFSET paging
+            if status_callback:
+                status_callback(f"Row count query failed ({e}); using the dataset's row count")
     
-    # First, get count of filtered data
-    count_sql = f"SELECT COUNT(*) as cnt FROM table {where_clause}"
-    url = f"https://api.domo.com/v1/datasets/query/execute/{dataset_id}"
-    headers = get_oauth_headers(token)
+    if progress_callback:
+        progress_callback(0, total_rows)
     
-    try:
-        response = requests.post(url, headers=headers, json={"sql": count_sql}, timeout=120)
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('rows') and result['rows'][0]:
-                total_rows = int(result['rows'][0][0])
-    except:
-        pass  # Use original total_rows if count fails
+    if cached_path:
+        chunks = extract_cache.iter_chunks(cached_path, cancel_check=cancel_check)
+    else:
+        chunks = extract_cache.capture(cache_key, column_names, iter_dataset_chunks(
+            instance, dataset_id, where_clause, min(total_rows, max_rows),
+            page_key=page_key, include_nulls=(page_key != date_column or not where_clause),
+            cancel_check=cancel_check, partitions=partitions, sizer=sizer,
+            column_names=column_names
+        ), expected_bytes=total_rows * estimate_row_bytes(schema))
     
-    while offset < min(total_rows, max_rows):
-        if progress_callback:
-            progress_callback(offset, total_rows)
-        
-        sql = f"SELECT * FROM table {where_clause} LIMIT {chunk_size} OFFSET {offset}"
-        
-        payload = {"sql": sql}
-        
-        response = requests.post(url, headers=headers, json=payload, timeout=300)
-        response.raise_for_status()
-        
-        result = response.json()
-        columns = result.get('columns', [])
-        rows = result.get('rows', [])
+    for offset, columns, rows, _ in chunks:
+        all_data.append(apply_schema_dtypes(pd.DataFrame(rows, columns=columns), schema))
         
-        if not rows:
-            break
-        
-        chunk_df = pd.DataFrame(rows, columns=columns)
-        all_data.append(chunk_df)
-        
-        offset += len(rows)
-        
-        # If we got fewer rows than requested, we're done
-        if len(rows) < chunk_size:
-            break
+        if progress_callback:
+            progress_callback(offset + len(rows), total_rows)
         
         # Memory safety: if we've collected too much data, stop
-        if offset >= max_rows:
+        if offset + len(rows) >= max_rows:
+            chunks.close()
             break
     
     if all_data:
@@ -627,8 +1613,6 @@ def export_dataset_data(instance: str, dataset_id: str, date_column: str = None,
 
 def create_dataset(instance: str, name: str, schema: List[Dict]) -> Dict:
     """Create a new dataset in the target instance."""
-    token = get_oauth_token(instance)
-    
     url = "https://api.domo.com/v1/datasets"
     
     payload = {
@@ -639,34 +1623,415 @@ def create_dataset(instance: str, name: str, schema: List[Dict]) -> Dict:
         }
     }
     
-    response = requests.post(url, headers=get_oauth_headers(token), json=payload, timeout=60)
+    response = get_http_session(instance).post(url, json=payload, timeout=60)
     response.raise_for_status()
-    return response.json()
+    dataset = response.json()
+    # Make the new dataset visible to name lookups before the next catalog sync
+    get_dataset_catalog().upsert(instance, [{'columns': len(schema), **dataset}])
+    return dataset
 
 
-def stream_copy_dataset(
-    source_instance: str, 
-    source_dataset_id: str,
-    target_instance: str,
-    target_dataset_id: str,
-    date_column: str = None,
-    start_date=None,
-    end_date=None,
+def write_rows_csv(handle, rows: List[list], column_names: List[str], header: bool = False):
+    """
+    Write query API rows straight to CSV without building a DataFrame.
+    Values keep their JSON types; None becomes an empty field, and fields are
+    quoted only when needed, matching DataFrame.to_csv output.
+    """
+    writer = csv.writer(handle, lineterminator='\n')
+    if header:
+        writer.writerow(column_names)
+    writer.writerows(rows)
+
+
+class ByteCounter(io.RawIOBase):
+    """Writable pass-through that counts the bytes written to the file object it wraps."""
+    
+    def __init__(self, target):
+        self.target = target
+        self.count = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self.target.write(data)
+        self.count += len(data)
+        return len(data)
+
+
+def encode_csv_body_sized(write_csv, compress: bool = False) -> Tuple[bytes, int]:
+    """
+    Build a UTF-8 CSV body by calling write_csv(text_handle); returns the body and
+    its uncompressed size in bytes.
+    With compress, rows are gzip-encoded as they are written, so the
+    uncompressed CSV never has to exist in memory as a whole.
+    """
+    raw = io.BytesIO()
+    sink = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_COMPRESSLEVEL) if compress else raw
+    counter = ByteCounter(sink)
+    text = io.TextIOWrapper(counter, encoding='utf-8', newline='')
+    write_csv(text)
+    text.flush()
+    text.detach()
+    if compress:
+        sink.close()
+    return raw.getvalue(), counter.count
+
+
+def encode_csv_body(write_csv, compress: bool = False) -> bytes:
+    """Build a UTF-8 CSV body (gzip-encoded with compress) by calling write_csv(text_handle)."""
+    return encode_csv_body_sized(write_csv, compress)[0]
+
+
+@st.cache_resource(show_spinner=False)
+def get_gzip_rejections() -> set:
+    """Upload endpoints (by instance and kind) that rejected gzip-encoded bodies."""
+    return set()
+
+
+def put_csv(instance: str, url: str, csv_data, compressed: bool = False, timeout: int = 300,
+            endpoint: str = "data"):
+    """
+    PUT a CSV body (bytes or a binary file), sending gzip bodies with Content-Encoding.
+    If the endpoint rejects the gzip body with any client error other than auth,
+    not-found or throttling, the body is decompressed and sent as plain CSV, and
+    later uploads to the same kind of endpoint skip compression.
+    """
+    session = get_http_session(instance)
+    rejections = get_gzip_rejections()
+    
+    def identity_body():
+        if isinstance(csv_data, bytes):
+            return gzip.decompress(csv_data)
+        csv_data.seek(0)
+        return gzip.GzipFile(fileobj=csv_data, mode='rb')
+    
+    if compressed and (instance, endpoint) in rejections:
+        csv_data, compressed = identity_body(), False
+    
+    headers = {'Content-Type': 'text/csv'}
+    if compressed:
+        headers['Content-Encoding'] = 'gzip'
+    response = session.put(url, headers=headers, data=csv_data, timeout=timeout)
+    
+    if compressed and 400 <= response.status_code < 500 and response.status_code not in (401, 403, 404, 429):
+        rejections.add((instance, endpoint))
+        response = session.put(url, headers={'Content-Type': 'text/csv'}, data=identity_body(), timeout=timeout)
+    
+    response.raise_for_status()
+    return response
+
+
+class StreamResolver:
+    """
+    Cached dataset id -> stream id index per instance.
+    
+    The index is built from every page of /v1/streams (fetched concurrently) and
+    updated in place when a stream is created, so repeat uploads to the same
+    dataset skip the lookup entirely. A miss rebuilds the index at most once
+    per STREAM_INDEX_MIN_AGE_SECONDS before a new stream is created; if the
+    streams cannot be listed, a stream is created as before. Each instance
+    has its own lock, so one instance's rebuild never holds up another's lookups.
+    """
+    
+    def __init__(self):
+        self._streams: Dict[str, Dict[str, int]] = {}
+        self._built_at: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def _instance_lock(self, instance: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(instance, threading.Lock())
+    
+    def _rebuild(self, instance: str):
+        streams = fetch_all_pages(instance, "https://api.domo.com/v1/streams", STREAM_LIST_PAGE_SIZE)
+        index = {}
+        for stream in streams:
+            dataset_id = stream.get('dataSet', {}).get('id')
+            if dataset_id and dataset_id not in index:
+                index[dataset_id] = stream.get('id')
+        self._streams[instance] = index
+        self._built_at[instance] = time.monotonic()
+    
+    def _create(self, instance: str, dataset_id: str) -> Optional[int]:
+        payload = {
+            "dataSet": {"id": dataset_id},
+            "updateMethod": "REPLACE"
+        }
+        response = get_http_session(instance).post("https://api.domo.com/v1/streams", json=payload, timeout=60)
+        if response.status_code in [200, 201]:
+            return response.json().get('id')
+        return None
+    
+    def resolve(self, instance: str, dataset_id: str, create: bool = True) -> Optional[int]:
+        with self._instance_lock(instance):
+            stream_id = self._streams.get(instance, {}).get(dataset_id)
+            if stream_id:
+                return stream_id
+            
+            built_at = self._built_at.get(instance)
+            if built_at is None or time.monotonic() - built_at > STREAM_INDEX_MIN_AGE_SECONDS:
+                try:
+                    self._rebuild(instance)
+                except (requests.RequestException, ValueError):
+                    # Listing failed; fall through to creating a stream, as before the index existed
+                    pass
+                else:
+                    stream_id = self._streams[instance].get(dataset_id)
+                    if stream_id:
+                        return stream_id
+            
+            if not create:
+                return None
+            stream_id = self._create(instance, dataset_id)
+            if stream_id:
+                self._streams.setdefault(instance, {})[dataset_id] = stream_id
+            return stream_id
+    
+    def invalidate(self, instance: str, dataset_id: str = None):
+        """Forget one mapping (e.g. its stream was deleted) or the whole instance index."""
+        with self._instance_lock(instance):
+            if dataset_id:
+                self._streams.get(instance, {}).pop(dataset_id, None)
+            else:
+                self._streams.pop(instance, None)
+                self._built_at.pop(instance, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_stream_resolver() -> StreamResolver:
+    return StreamResolver()
+
+
+def get_or_create_stream(instance: str, dataset_id: str) -> Optional[int]:
+    """Find the stream feeding a dataset, creating a REPLACE stream if there is none."""
+    return get_stream_resolver().resolve(instance, dataset_id)
+
+
+def set_stream_update_method(instance: str, stream_id: int, update_method: str):
+    """Make the stream's next executions REPLACE or APPEND to the dataset."""
+    stream_url = f"https://api.domo.com/v1/streams/{stream_id}"
+    response = get_http_session(instance).patch(stream_url, json={"updateMethod": update_method}, timeout=60)
+    response.raise_for_status()
+
+
+def create_stream_execution(instance: str, stream_id: int, update_method: str = "REPLACE") -> int:
+    """
+    Open a new stream execution that will REPLACE or APPEND to the dataset and return its id.
+    A stream keeps its last update method, so it is set before every execution.
+    """
+    set_stream_update_method(instance, stream_id, update_method)
+    exec_url = f"https://api.domo.com/v1/streams/{stream_id}/executions"
+    response = get_http_session(instance).post(exec_url, timeout=60)
+    if response.status_code == 404:
+        # The stream is gone; drop the cached index so the next lookup rebuilds it
+        get_stream_resolver().invalidate(instance)
+    response.raise_for_status()
+    return response.json().get('id')
+
+
+def upload_stream_part(instance: str, stream_id: int, execution_id: int, part_num: int, csv_data: bytes,
+                       compressed: bool = False):
+    """Upload one CSV part (optionally gzip-encoded) to an open stream execution."""
+    part_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/part/{part_num}"
+    put_csv(instance, part_url, csv_data, compressed=compressed, timeout=300, endpoint="stream_part")
+
+
+def commit_stream_execution(instance: str, stream_id: int, execution_id: int):
+    """Commit a stream execution once all parts are uploaded."""
+    commit_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/commit"
+    response = get_http_session(instance).put(commit_url, timeout=120)
+    response.raise_for_status()
+
+
+def get_stream_execution_state(instance: str, stream_id: int, execution_id: int) -> Optional[str]:
+    """Current state of a stream execution (e.g. ACTIVE, SUCCESS, ABORTED), or None if unknown."""
+    exec_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}"
+    try:
+        response = get_http_session(instance).get(exec_url, timeout=30)
+        response.raise_for_status()
+        return response.json().get('currentState')
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def abort_stream_execution(instance: str, stream_id: int, execution_id: int):
+    """Best-effort abort of a stream execution after a failure."""
+    try:
+        abort_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/abort"
+        get_http_session(instance).put(abort_url, timeout=30)
+    except:
+        pass
+
+
+class StreamPartUploader:
+    """
+    Upload numbered parts of one stream execution concurrently.
+    
+    At most max_in_flight parts are uploading at once; submit() blocks until a
+    slot is free. Transient failures are retried by the session's retry policy,
+    and commit() only runs once every submitted part has been acknowledged. on_ack(part_num) is called
+    from the submitting thread as each part is acknowledged.
+    """
+    
+    def __init__(self, instance: str, stream_id: int, execution_id: int, max_in_flight: int = None,
+                 on_ack=None):
+        self.instance = instance
+        self.stream_id = stream_id
+        self.execution_id = execution_id
+        self.max_in_flight = max_in_flight or get_instance_concurrency(instance)
+        self.on_ack = on_ack
+        self.acknowledged = set()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+    
+    def _collect(self, done):
+        for future in done:
+            part_num = self._pending.pop(future)
+            future.result()  # Re-raise the part's final failure
+            self.acknowledged.add(part_num)
+            if self.on_ack:
+                self.on_ack(part_num)
+    
+    def submit(self, part_num: int, csv_data: bytes, compressed: bool = False):
+        while len(self._pending) >= self.max_in_flight:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        future = submit_in_context(
+            self._executor, upload_stream_part, self.instance, self.stream_id, self.execution_id, part_num, csv_data, compressed
+        )
+        self._pending[future] = part_num
+    
+    def wait_all(self):
+        while self._pending:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+    
+    def commit(self):
+        self.wait_all()
+        commit_stream_execution(self.instance, self.stream_id, self.execution_id)
+        self._executor.shutdown(wait=False)
+    
+    def detach(self):
+        """Stop uploading but leave the execution open (e.g. to resume it later)."""
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+    
+    def abort(self):
+        self.detach()
+        abort_stream_execution(self.instance, self.stream_id, self.execution_id)
+
+
+def pipeline_chunks_to_stream(target_instance: str, stream_id: int, chunks, column_names: List[str],
+                              total_rows: int, progress_callback=None, status_callback=None,
+                              compress: bool = UPLOAD_GZIP, checkpoint: 'CopyCheckpoint' = None,
+                              update_method: str = "REPLACE") -> int:
+    """
+    Upload each fetched chunk as a stream part while later chunks are still being fetched.
+    Commits after the last part and aborts the execution on any failure.
+    A new execution REPLACEs the dataset's data or APPENDs to it, per update_method.
+    
+    With a persisted checkpoint, the execution it records is reused, its progress is
+    saved as parts are acknowledged, and a failure leaves the execution open so the
+    copy can be resumed. Returns total rows uploaded.
+    """
+    keep_open = checkpoint is not None and checkpoint.path is not None
+    checkpoint = checkpoint or CopyCheckpoint()
+    execution_id = checkpoint.execution_id
+    if execution_id is None:
+        execution_id = create_stream_execution(target_instance, stream_id, update_method)
+        checkpoint.bind(stream_id, execution_id)
+    uploader = StreamPartUploader(target_instance, stream_id, execution_id, on_ack=checkpoint.acknowledge)
+    chunk_num = 0
+    resumed_rows = total_copied = checkpoint.rows_done()
+    started = time.monotonic()
+    
+    def empty_part(part_num):
+        return encode_csv_body(lambda f: write_rows_csv(f, [], column_names, header=(part_num == 1)), compress)
+    
+    try:
+        for offset, columns, rows, (lane, position) in chunks:
+            part_num = checkpoint.allocate(lane, position, len(rows))
+            # Only include header in first part
+            csv_data = encode_csv_body(
+                lambda f: write_rows_csv(f, rows, columns, header=(part_num == 1)), compress
+            )
+            uploader.submit(part_num, csv_data, compress)
+            
+            chunk_num += 1
+            total_copied += len(rows)
+            del rows, csv_data
+            
+            if progress_callback:
+                progress_callback(min(total_copied, total_rows), total_rows)
+            
+            if status_callback:
+                status_callback(f"Fetched chunk {chunk_num}, uploading as stream part {part_num} ({total_copied:,} rows so far)")
+        
+        # Parts an earlier attempt uploaded past its checkpoint but this run did not need
+        for part_num in checkpoint.leftover_parts():
+            uploader.submit(part_num, empty_part(part_num), compress)
+        
+        if checkpoint.get('next_part') == 1:
+            # No rows matched; replace the target with an empty, header-only part
+            uploader.submit(checkpoint.allocate(0, None, 0), empty_part(1), compress)
+        
+        if status_callback:
+            rate = (total_copied - resumed_rows) / max(time.monotonic() - started, 0.001)
+            status_callback(f"Committing {total_copied:,} rows ({rate:,.0f} rows/sec)...")
+        uploader.commit()
+        checkpoint.discard()
+        return total_copied
+        
+    except Exception:
+        if keep_open:
+            uploader.detach()
+        else:
+            uploader.abort()
+        raise
+
+
+def stream_copy_dataset(
+    source_instance: str, 
+    source_dataset_id: str,
+    target_instance: str,
+    target_dataset_id: str,
+    date_column: str = None,
+    start_date=None,
+    end_date=None,
     progress_callback=None,
     status_callback=None,
-    cancel_check=None
+    cancel_check=None,
+    page_key: str = None,
+    pipeline_upload: bool = True,
+    compress: bool = UPLOAD_GZIP,
+    after=None,
+    append: bool = False,
+    replace_range: bool = False
 ) -> int:
     """
     Stream data directly from source to target without loading all into memory.
-    Fetches chunks from source, writes to temp file, then uploads to target.
-    Returns total rows copied.
+    With pipeline_upload, each fetched chunk is uploaded as a Stream API part while
+    later chunks are still being fetched; otherwise chunks are spooled to a temp
+    file that is uploaded at the end.
+    Pages by keyset on page_key (default: the date column), falling back to OFFSET.
+    With compress, uploads are gzip-encoded.
+    Pipelined copies are checkpointed (see CopyCheckpoint); running the same copy
+    again after a failure resumes it instead of starting over. Complete extracts
+    are kept in the local ExtractCache and repeat copies are served from it.
+    With after, only rows whose date_column is later than it (up to end_date, if
+    given) are copied; with append, they are added to the target instead of
+    replacing its data.
+    With replace_range, only the [start_date, end_date] slice of the target is
+    replaced: its rows outside the range (and those with no date) are read back
+    and uploaded into the same execution as the source slice.
+    Returns total rows copied from the source.
     """
     import tempfile
     import os
     
-    source_token = get_oauth_token(source_instance)
-    target_token = get_oauth_token(target_instance)
-    
     # Get source dataset info
     source_info = get_dataset_info(source_instance, source_dataset_id)
     schema = source_info.get('schema', {}).get('columns', [])
@@ -675,87 +2040,220 @@ def stream_copy_dataset(
     
     # Build WHERE clause for date filtering
     where_clause = ""
-    if date_column and start_date and end_date:
-        where_clause = f"WHERE `{date_column}` >= '{start_date}' AND `{date_column}` <= '{end_date}'"
+    range_condition = None
+    if date_column and after is not None:
+        where_clause = f"WHERE `{date_column}` > {sql_literal(after)}"
+        if end_date:
+            where_clause += f" AND `{date_column}` <= '{end_date}'"
+    elif date_column and start_date and end_date:
+        range_condition = f"`{date_column}` >= '{start_date}' AND `{date_column}` <= '{end_date}'"
+        where_clause = f"WHERE {range_condition}"
+    
+    # The target rows a range replace keeps: the complement of the source slice
+    keep_where = None
+    if replace_range:
+        if not range_condition or append:
+            raise Exception("Replacing a date range needs a date column, start date and end date")
+        # Parenthesised so paging conditions can be ANDed onto it
+        keep_where = f"WHERE (NOT ({range_condition}) OR `{date_column}` IS NULL)"
+        # The kept rows are re-uploaded under the source's columns; fail before transferring anything
+        target_schema = get_dataset_info(target_instance, target_dataset_id).get('schema', {}).get('columns', [])
+        target_columns = {col['name'] for col in target_schema}
+        missing = [name for name in column_names if name not in target_columns]
+        if missing:
+            raise Exception(f"Target dataset is missing columns {', '.join(missing)}; run a full copy instead")
+    
+    # Rows per chunk adapt to response size/latency, starting from the schema width
+    sizer = AdaptiveChunkSizer.for_schema(schema)
+    page_key = page_key or date_column
+    include_nulls = page_key != date_column or not where_clause
+    
+    # A repeat of an unchanged extract is served from the local cache
+    extract_cache = get_extract_cache()
+    cache_key = ExtractCache.key(source_instance, source_dataset_id, where_clause, column_names, source_info.get('updatedAt'))
+    cached_path = extract_cache.get(cache_key)
+    
+    # Pipelined copies checkpoint their progress; pick up an earlier attempt's open execution
+    stream_id = get_or_create_stream(target_instance, target_dataset_id) if pipeline_upload else None
+    checkpoint = None
+    resuming = False
+    if stream_id:
+        checkpoint = CopyCheckpoint.for_copy(
+            source_instance, source_dataset_id, target_instance, target_dataset_id, where_clause, page_key,
+            keep_where=keep_where
+        )
+        if checkpoint.execution_id is not None:
+            resuming = (
+                not cached_path
+                and checkpoint.get('stream_id') == stream_id
+                and checkpoint.get('source_updated_at') == source_info.get('updatedAt')
+                and get_stream_execution_state(target_instance, stream_id, checkpoint.execution_id) == 'ACTIVE'
+            )
+            if not resuming:
+                abort_stream_execution(target_instance, checkpoint.get('stream_id'), checkpoint.execution_id)
+                checkpoint.discard()
+                checkpoint.reset()
+        # E.g. an earlier day's attempt, whose filter ended on that day
+        for stale in checkpoint.stale_checkpoints():
+            identity = stale.get('identity')
+            if stale.execution_id is not None:
+                abort_stream_execution(identity['target_instance'], stale.get('stream_id'), stale.execution_id)
+            stale.discard()
+    
+    partitions = None
+    if cached_path:
+        total_rows = extract_cache.row_count(cached_path)
+        if status_callback:
+            status_callback("Serving this extract from the local cache (no production queries)")
+    elif resuming:
+        # Re-use the earlier attempt's plan so lanes and positions still line up
+        partitions = checkpoint.get('partitions')
+        total_rows = checkpoint.get('total_rows', total_rows)
+        if status_callback:
+            status_callback(f"Resuming from checkpoint ({checkpoint.rows_done():,} rows already uploaded)")
+    elif where_clause:
+        # Split the date window into partitions; the density probe also gives the row count
+        if status_callback:
+            status_callback("Estimating row density across the date range...")
+        partitions, probed_rows = plan_date_partitions(
+            source_instance, source_dataset_id, date_column, where_clause, sizer.next_size()
+        )
+        if probed_rows is not None:
+            total_rows = probed_rows
     
     # Get count of rows to copy
-    if where_clause:
-        count_sql = f"SELECT COUNT(*) as cnt FROM table {where_clause}"
-        url = f"https://api.domo.com/v1/datasets/query/execute/{source_dataset_id}"
-        headers = {'Authorization': f'Bearer {source_token}', 'Content-Type': 'application/json'}
-        
+    if where_clause and partitions is None and not resuming and not cached_path:
         try:
-            response = requests.post(url, headers=headers, json={"sql": count_sql}, timeout=120)
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('rows') and result['rows'][0]:
-                    total_rows = int(result['rows'][0][0])
-        except:
-            pass
+            total_rows = count_rows(source_instance, source_dataset_id, where_clause)
+        except (requests.RequestException, ValueError, TypeError) as e:
+            # The unfiltered row count still bounds the OFFSET paging
+            if status_callback:
+                status_callback(f"Row count query failed ({e}); using the dataset's row count")
+    
+    kept_rows = 0
+    if keep_where:
+        if status_callback:
+            status_callback("Counting the target rows outside the date range...")
+        kept_rows = count_rows(target_instance, target_dataset_id, keep_where)
+        if not resuming:
+            # A checkpoint's total already includes them
+            total_rows += kept_rows
+    
+    if checkpoint and not resuming:
+        checkpoint.reset(
+            source_updated_at=source_info.get('updatedAt'), include_nulls=include_nulls,
+            partitions=partitions, total_rows=total_rows
+        )
     
     if status_callback:
         status_callback(f"Total rows to copy: {total_rows:,}")
     
-    # Create temp file to store CSV data
-    temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8')
+    if progress_callback:
+        progress_callback(checkpoint.rows_done() if checkpoint else 0, total_rows)
+    
+    if status_callback and not cached_path:
+        if partitions and len(partitions) > 1:
+            status_callback(f"Fetching {len(partitions)} date partitions ({get_instance_concurrency(source_instance)} in parallel)...")
+        elif page_key:
+            status_callback(f"Fetching chunks ordered by {page_key}...")
+        else:
+            status_callback(f"Fetching chunks ({get_instance_concurrency(source_instance)} in parallel)...")
+    
+    if cached_path:
+        chunks = extract_cache.iter_chunks(cached_path, cancel_check=cancel_check)
+    else:
+        # Chunks are fetched lazily, several queries in flight where possible
+        chunks = iter_dataset_chunks(
+            source_instance, source_dataset_id, where_clause, total_rows,
+            page_key=page_key, include_nulls=include_nulls,
+            cancel_check=cancel_check, partitions=partitions, sizer=sizer,
+            resume_from=checkpoint.resume_positions() if checkpoint else None,
+            column_names=column_names
+        )
+        if not resuming:
+            # A resumed run skips rows, so only complete extracts are cached
+            chunks = extract_cache.capture(cache_key, column_names, chunks,
+                                           expected_bytes=(total_rows - kept_rows) * estimate_row_bytes(schema))
+    
+    kept_lane = -1
+    kept_copied = checkpoint.rows_done(kept_lane) if checkpoint else 0
+    if keep_where:
+        source_chunks = chunks
+        
+        def merged_chunks():
+            # The source slice first, then the target's rows outside it, in their own lane
+            nonlocal kept_copied
+            yield from source_chunks
+            if status_callback:
+                status_callback(f"Re-uploading {kept_rows:,} target rows outside the date range...")
+            kept = iter_kept_target_chunks(
+                target_instance, target_dataset_id, keep_where, kept_rows, column_names,
+                page_key=page_key, cancel_check=cancel_check, sizer=AdaptiveChunkSizer.for_schema(schema),
+                lane=kept_lane,
+                resume_from=checkpoint.resume_positions().get(kept_lane) if checkpoint else None
+            )
+            try:
+                for offset, columns, rows, lane_position in kept:
+                    kept_copied += len(rows)
+                    yield total_rows - kept_rows + offset, columns, rows, lane_position
+            finally:
+                kept.close()
+        
+        chunks = merged_chunks()
+    
+    if stream_id:
+        try:
+            total_copied = pipeline_chunks_to_stream(
+                target_instance, stream_id, chunks, column_names, total_rows,
+                progress_callback=progress_callback, status_callback=status_callback,
+                compress=compress, checkpoint=checkpoint,
+                update_method="APPEND" if append else "REPLACE"
+            )
+        except Exception:
+            chunks.close()  # Stop any partition workers still extracting
+            if cancel_check and cancel_check():
+                # A cancelled copy is not resumed; drop its execution and checkpoint
+                abort_stream_execution(target_instance, stream_id, checkpoint.execution_id)
+                checkpoint.discard()
+            elif status_callback:
+                status_callback("Copy interrupted; progress is checkpointed and resumes on the next run")
+            raise
+        if status_callback:
+            status_callback(f"Upload complete ({total_copied:,} rows)")
+        return total_copied - kept_copied
+    
+    # Create temp file to store CSV data (gzip-encoded as it is written when compressing)
+    compress = compress and DATA_UPLOAD_GZIP
+    temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv.gz' if compress else '.csv', delete=False, encoding='utf-8')
     temp_path = temp_file.name
+    if compress:
+        temp_file.close()
+        temp_file = gzip.open(temp_path, 'wt', encoding='utf-8', newline='', compresslevel=GZIP_COMPRESSLEVEL)
     
     try:
         # Stream data in chunks to temp file
-        chunk_size = 100000  # 100k rows per chunk
-        offset = 0
         chunk_num = 1
         total_copied = 0
         header_written = False
         
-        source_headers = {'Authorization': f'Bearer {source_token}', 'Content-Type': 'application/json'}
-        
-        while offset < total_rows:
-            # Check for cancellation
-            if cancel_check and cancel_check():
-                if status_callback:
-                    status_callback("Operation cancelled by user")
-                raise Exception("Operation cancelled by user")
-            
-            if progress_callback:
-                progress_callback(offset, total_rows)
-            
-            if status_callback:
-                status_callback(f"Fetching chunk {chunk_num} (rows {offset:,} - {min(offset + chunk_size, total_rows):,})...")
-            
-            # Fetch chunk from source
-            sql = f"SELECT * FROM table {where_clause} LIMIT {chunk_size} OFFSET {offset}"
-            url = f"https://api.domo.com/v1/datasets/query/execute/{source_dataset_id}"
-            
-            response = requests.post(url, headers=source_headers, json={"sql": sql}, timeout=300)
-            response.raise_for_status()
-            
-            result = response.json()
-            columns = result.get('columns', [])
-            rows = result.get('rows', [])
-            
-            if not rows:
-                break
-            
-            # Convert to CSV and write to temp file
-            chunk_df = pd.DataFrame(rows, columns=columns)
-            chunk_df.to_csv(temp_file, index=False, header=not header_written, mode='a')
+        for offset, columns, rows, _ in chunks:
+            # Write rows straight to the temp file as CSV
+            write_rows_csv(temp_file, rows, columns, header=not header_written)
             header_written = True
             
             rows_in_chunk = len(rows)
             total_copied += rows_in_chunk
             
             # Free memory
-            del chunk_df
             del rows
-            del result
             
-            offset += chunk_size
-            chunk_num += 1
+            if progress_callback:
+                progress_callback(min(offset + rows_in_chunk, total_rows), total_rows)
             
-            # Check if we got fewer rows than requested (end of data)
-            if rows_in_chunk < chunk_size:
-                break
+            if status_callback:
+                status_callback(f"Fetched chunk {chunk_num} (rows {offset:,} - {offset + rows_in_chunk:,})")
+            
+            chunk_num += 1
         
         # Close temp file
         temp_file.close()
@@ -773,18 +2271,18 @@ def stream_copy_dataset(
             progress_callback(total_rows, total_rows)
         
         # Upload the temp file to target
-        target_headers = {'Authorization': f'Bearer {target_token}', 'Content-Type': 'text/csv'}
         upload_url = f"https://api.domo.com/v1/datasets/{target_dataset_id}/data"
+        if append:
+            upload_url += "?updateMethod=APPEND"
         
         # Read and upload in streaming fashion
         with open(temp_path, 'rb') as f:
-            response = requests.put(upload_url, headers=target_headers, data=f, timeout=600)
-            response.raise_for_status()
+            put_csv(target_instance, upload_url, f, compressed=compress, timeout=600)
         
         if status_callback:
             status_callback(f"Upload complete ({total_copied:,} rows)")
         
-        return total_copied
+        return total_copied - kept_copied
         
     finally:
         # Clean up temp file
@@ -793,189 +2291,116 @@ def stream_copy_dataset(
                 os.unlink(temp_path)
         except:
             pass
-    """Upload data to a dataset with support for large datasets."""
-    token = get_oauth_token(instance)
-    
-    total_rows = len(df)
-    
-    # For smaller datasets, upload directly
-    if total_rows < 100000:
-        url = f"https://api.domo.com/v1/datasets/{dataset_id}/data"
-        headers = get_oauth_headers(token)
-        headers['Content-Type'] = 'text/csv'
-        
-        csv_data = df.to_csv(index=False)
-        
-        response = requests.put(url, headers=headers, data=csv_data.encode('utf-8'), timeout=300)
-        response.raise_for_status()
-        return True
-    
-    # For large datasets, use stream API with parts
-    headers = get_oauth_headers(token)
-    
-    # Get or create stream for this dataset
-    stream_url = "https://api.domo.com/v1/streams"
-    
-    # Search for existing stream
-    stream_id = None
-    params = {'limit': 500}
-    response = requests.get(stream_url, headers=headers, params=params, timeout=60)
-    
-    if response.status_code == 200:
-        streams = response.json()
-        for stream in streams:
-            if stream.get('dataSet', {}).get('id') == dataset_id:
-                stream_id = stream.get('id')
-                break
-    
-    # If no stream exists, create one
-    if not stream_id:
-        payload = {
-            "dataSet": {"id": dataset_id},
-            "updateMethod": "REPLACE"
-        }
-        response = requests.post(stream_url, headers=headers, json=payload, timeout=60)
-        if response.status_code in [200, 201]:
-            stream_id = response.json().get('id')
-    
-    if stream_id:
-        # Use stream-based upload
-        return upload_via_stream(instance, stream_id, df, progress_callback)
-    else:
-        # Fallback: try direct upload anyway
-        url = f"https://api.domo.com/v1/datasets/{dataset_id}/data"
-        headers = get_oauth_headers(token)
-        headers['Content-Type'] = 'text/csv'
-        
-        csv_data = df.to_csv(index=False)
-        
-        response = requests.put(url, headers=headers, data=csv_data.encode('utf-8'), timeout=600)
-        response.raise_for_status()
-        return True
 
 
-def upload_data_to_dataset(instance: str, dataset_id: str, df: pd.DataFrame, progress_callback=None) -> bool:
-    """Upload data to a dataset with support for large datasets."""
-    token = get_oauth_token(instance)
-    
+def upload_data_to_dataset(instance: str, dataset_id: str, df: pd.DataFrame, progress_callback=None,
+                           compress: bool = UPLOAD_GZIP, cancel_check=None) -> bool:
+    """Upload data to a dataset with support for large datasets; cancel_check is polled between parts."""
     total_rows = len(df)
+    # Direct /data PUTs are compressed only where DATA_UPLOAD_GZIP allows it
+    compress_data = compress and DATA_UPLOAD_GZIP
     
     # For smaller datasets, upload directly
     if total_rows < 100000:
         url = f"https://api.domo.com/v1/datasets/{dataset_id}/data"
-        headers = get_oauth_headers(token)
-        headers['Content-Type'] = 'text/csv'
+        csv_data = encode_csv_body(lambda f: df.to_csv(f, index=False), compress_data)
         
-        csv_data = df.to_csv(index=False)
-        
-        response = requests.put(url, headers=headers, data=csv_data.encode('utf-8'), timeout=300)
-        response.raise_for_status()
+        put_csv(instance, url, csv_data, compressed=compress_data, timeout=300)
         return True
     
     # For large datasets, use stream API with parts
-    headers = get_oauth_headers(token)
-    
-    # Get or create stream for this dataset
-    stream_url = "https://api.domo.com/v1/streams"
-    
-    # Search for existing stream
-    stream_id = None
-    params = {'limit': 500}
-    response = requests.get(stream_url, headers=headers, params=params, timeout=60)
-    
-    if response.status_code == 200:
-        streams = response.json()
-        for stream in streams:
-            if stream.get('dataSet', {}).get('id') == dataset_id:
-                stream_id = stream.get('id')
-                break
-    
-    # If no stream exists, create one
-    if not stream_id:
-        payload = {
-            "dataSet": {"id": dataset_id},
-            "updateMethod": "REPLACE"
-        }
-        response = requests.post(stream_url, headers=headers, json=payload, timeout=60)
-        if response.status_code in [200, 201]:
-            stream_id = response.json().get('id')
+    stream_id = get_or_create_stream(instance, dataset_id)
     
     if stream_id:
         # Use stream-based upload
-        return upload_via_stream(instance, stream_id, df, progress_callback)
+        return upload_via_stream(instance, stream_id, df, progress_callback, compress=compress,
+                                 cancel_check=cancel_check)
     else:
         # Fallback: try direct upload anyway
         url = f"https://api.domo.com/v1/datasets/{dataset_id}/data"
-        headers = get_oauth_headers(token)
-        headers['Content-Type'] = 'text/csv'
-        
-        csv_data = df.to_csv(index=False)
+        csv_data = encode_csv_body(lambda f: df.to_csv(f, index=False), compress_data)
         
-        response = requests.put(url, headers=headers, data=csv_data.encode('utf-8'), timeout=600)
-        response.raise_for_status()
+        put_csv(instance, url, csv_data, compressed=compress_data, timeout=600)
         return True
 
 
-def upload_via_stream(instance: str, stream_id: int, df: pd.DataFrame, progress_callback=None) -> bool:
-    """Upload data via stream API with chunked parts."""
-    token = get_oauth_token(instance)
-    headers = get_oauth_headers(token)
-    
-    # Create execution
-    exec_url = f"https://api.domo.com/v1/streams/{stream_id}/executions"
-    response = requests.post(exec_url, headers=headers, timeout=60)
-    response.raise_for_status()
-    
-    execution_id = response.json().get('id')
+def upload_via_stream(instance: str, stream_id: int, df: pd.DataFrame, progress_callback=None,
+                      compress: bool = UPLOAD_GZIP, cancel_check=None) -> bool:
+    """Upload data via stream API with chunked parts, several parts in flight at once."""
+    execution_id = create_stream_execution(instance, stream_id)
+    uploader = StreamPartUploader(instance, stream_id, execution_id)
     
-    # Upload in chunks (100k rows per chunk for memory efficiency)
-    chunk_size = 100000
     total_rows = len(df)
     part_num = 1
     
+    # Size parts by bytes: estimate row width from a sample, then adapt to encoded part sizes
+    sample = df.head(1000)
+    sample_bytes = len(sample.to_csv(index=False, header=False).encode('utf-8'))
+    sizer = AdaptiveChunkSizer(row_bytes=sample_bytes // max(len(sample), 1))
+    
     try:
-        for start_idx in range(0, total_rows, chunk_size):
+        start_idx = 0
+        while start_idx < total_rows:
+            if cancel_check and cancel_check():
+                raise Exception("Operation cancelled by user")
             if progress_callback:
                 progress_callback(start_idx, total_rows)
             
-            end_idx = min(start_idx + chunk_size, total_rows)
+            end_idx = min(start_idx + sizer.next_size(), total_rows)
             chunk_df = df.iloc[start_idx:end_idx]
             
             # Only include header in first part
-            csv_data = chunk_df.to_csv(index=False, header=(part_num == 1))
-            
-            part_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/part/{part_num}"
-            headers_csv = get_oauth_headers(token)
-            headers_csv['Content-Type'] = 'text/csv'
+            csv_data, csv_bytes = encode_csv_body_sized(
+                lambda f: chunk_df.to_csv(f, index=False, header=(part_num == 1)), compress
+            )
+            # The sizer was seeded with uncompressed row widths, so it must see uncompressed sizes
+            sizer.observe(len(chunk_df), csv_bytes)
             
-            response = requests.put(part_url, headers=headers_csv, data=csv_data.encode('utf-8'), timeout=300)
-            response.raise_for_status()
+            uploader.submit(part_num, csv_data, compress)
             
             part_num += 1
+            start_idx = end_idx
         
-        # Commit execution
-        commit_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/commit"
-        response = requests.put(commit_url, headers=headers, timeout=120)
-        response.raise_for_status()
+        # Commit execution once every part is acknowledged
+        uploader.commit()
         
         return True
         
     except Exception as e:
         # Try to abort execution on failure
-        try:
-            abort_url = f"https://api.domo.com/v1/streams/{stream_id}/executions/{execution_id}/abort"
-            requests.put(abort_url, headers=headers, timeout=30)
-        except:
-            pass
+        uploader.abort()
         raise e
 
 
-def check_dataset_exists_in_dev(dataset_name: str, dev_datasets: List[Dict]) -> Optional[Dict]:
+def check_dataset_exists_in_dev(dataset_name: str, dev_index: 'DatasetNameIndex') -> Optional[Dict]:
     """Check if a dataset with the same name exists in dev."""
-    for ds in dev_datasets:
-        if ds.get('name', '').lower() == dataset_name.lower():
-            return ds
-    return None
+    return dev_index.lookup(dataset_name)
+
+
+def schema_dtypes(schema: List[Dict]) -> Dict[str, object]:
+    """pandas dtypes for a DOMO schema: nullable integers, floats, and text for everything else."""
+    dtypes = {}
+    for col in schema:
+        col_type = col.get('type', '').upper()
+        if col_type == 'LONG':
+            dtypes[col['name']] = 'Int64'
+        elif col_type in ('DOUBLE', 'DECIMAL'):
+            dtypes[col['name']] = 'float64'
+        else:
+            dtypes[col['name']] = object
+    return dtypes
+
+
+def apply_schema_dtypes(df: pd.DataFrame, schema: List[Dict]) -> pd.DataFrame:
+    """Convert a frame's columns to their schema_dtypes, whether its values are typed or text."""
+    for name, dtype in schema_dtypes(schema).items():
+        if name not in df.columns:
+            continue
+        if dtype is object:
+            df[name] = df[name].astype(object)
+        else:
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype(dtype)
+    return df
 
 
 def get_date_columns(schema: List[Dict]) -> List[str]:
@@ -991,6 +2416,1075 @@ def format_row_count(count) -> str:
     return f"{count:,}"
 
 
+# =============================================================================
+# DATASET CATALOG
+# =============================================================================
+
+class DatasetCatalog:
+    """
+    SQLite-backed copy of each instance's dataset list (id, name, rows, columns, updatedAt),
+    plus the history of successful copies.
+    
+    Survives restarts; sync_catalog() keeps it current. A new connection is opened per
+    call so the catalog can be used from any thread.
+    """
+    
+    def __init__(self, path: str = CATALOG_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS datasets (
+                    instance TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    name TEXT,
+                    rows INTEGER,
+                    columns INTEGER,
+                    updated_at TEXT,
+                    PRIMARY KEY (instance, id)
+                );
+                CREATE TABLE IF NOT EXISTS catalog_sync (
+                    instance TEXT PRIMARY KEY,
+                    full_sync_at REAL NOT NULL,
+                    synced_at REAL NOT NULL,
+                    max_updated_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS copy_history (
+                    source_id TEXT NOT NULL,
+                    filter TEXT NOT NULL,
+                    source_updated_at TEXT,
+                    source_rows INTEGER,
+                    target_id TEXT NOT NULL,
+                    rows INTEGER,
+                    mode TEXT,
+                    started_at REAL NOT NULL,
+                    seconds REAL
+                );
+                CREATE INDEX IF NOT EXISTS copy_history_target
+                    ON copy_history (target_id, started_at);
+            """)
+    
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) and is closed when the block ends."""
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+    
+    @staticmethod
+    def _row(ds: Dict) -> Tuple:
+        return (ds.get('id'), ds.get('name'), ds.get('rows'), ds.get('columns'), ds.get('updatedAt'))
+    
+    def load(self, instance: str) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, name, rows, columns, updated_at FROM datasets WHERE instance = ? ORDER BY name",
+                (instance,)
+            ).fetchall()
+        return [
+            {'id': ds_id, 'name': name, 'rows': row_count, 'columns': col_count, 'updatedAt': updated_at}
+            for ds_id, name, row_count, col_count, updated_at in rows
+        ]
+    
+    def version(self, instance: str) -> Optional[float]:
+        """Changes whenever the instance's catalog is synced; use it as a cache key."""
+        state = self.sync_state(instance)
+        return state['synced_at'] if state else None
+    
+    def sync_state(self, instance: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT full_sync_at, synced_at, max_updated_at FROM catalog_sync WHERE instance = ?",
+                (instance,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'full_sync_at': row[0], 'synced_at': row[1], 'max_updated_at': row[2]}
+    
+    def replace_all(self, instance: str, datasets: List[Dict]):
+        now = time.time()
+        max_updated = max((ds.get('updatedAt') or '' for ds in datasets), default='')
+        with self._connect() as conn:
+            conn.execute("DELETE FROM datasets WHERE instance = ?", (instance,))
+            conn.executemany(
+                "INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?)",
+                [(instance,) + self._row(ds) for ds in datasets]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_sync VALUES (?, ?, ?, ?)",
+                (instance, now, now, max_updated)
+            )
+    
+    def merge(self, instance: str, datasets: List[Dict]):
+        state = self.sync_state(instance)
+        max_updated = max([ds.get('updatedAt') or '' for ds in datasets] + [state['max_updated_at'] or ''])
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?)",
+                [(instance,) + self._row(ds) for ds in datasets]
+            )
+            conn.execute(
+                "UPDATE catalog_sync SET synced_at = ?, max_updated_at = ? WHERE instance = ?",
+                (time.time(), max_updated, instance)
+            )
+    
+    def upsert(self, instance: str, datasets: List[Dict]):
+        """
+        Add or update datasets this app changed itself (e.g. just created), bumping the
+        version so name lookups see them; the incremental sync watermark is left alone.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?)",
+                [(instance,) + self._row(ds) for ds in datasets]
+            )
+            conn.execute("UPDATE catalog_sync SET synced_at = ? WHERE instance = ?", (time.time(), instance))
+    
+    def record_copy(self, source_id: str, filter_key: str, source_updated_at, source_rows: int,
+                    target_id: str, rows: int, mode: str, started_at: float, seconds: float):
+        """Add a successful copy to the history."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO copy_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source_id, filter_key, source_updated_at, source_rows, target_id, rows, mode,
+                 started_at, round(seconds, 1))
+            )
+    
+    def last_copy(self, target_id: str) -> Optional[Dict]:
+        """The most recent successful copy into a target, whatever its source or filter, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT source_id, filter, source_updated_at, source_rows, rows, mode, started_at, seconds "
+                "FROM copy_history WHERE target_id = ? ORDER BY started_at DESC LIMIT 1",
+                (target_id,)
+            ).fetchone()
+        if not row:
+            return None
+        keys = ('source_id', 'filter', 'source_updated_at', 'source_rows', 'rows', 'mode', 'started_at', 'seconds')
+        return dict(zip(keys, row))
+
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_catalog() -> DatasetCatalog:
+    return DatasetCatalog()
+
+
+def sync_catalog(instance: str, full: bool = False):
+    """
+    Bring the local catalog of an instance up to date.
+    
+    Does a full rescan when forced, on first use, or once CATALOG_TTL_SECONDS have
+    passed since the last one (which also drops deleted datasets); otherwise pulls
+    only datasets updated since the newest one already in the catalog.
+    """
+    catalog = get_dataset_catalog()
+    state = catalog.sync_state(instance)
+    
+    if full or not state or time.time() - state['full_sync_at'] > CATALOG_TTL_SECONDS:
+        catalog.replace_all(instance, fetch_all_datasets(instance))
+    else:
+        catalog.merge(instance, fetch_datasets_updated_since(instance, state['max_updated_at'] or ''))
+
+
+class DatasetNameIndex:
+    """Case-insensitive name -> datasets index over one catalog snapshot."""
+    
+    def __init__(self, datasets: List[Dict]):
+        self._by_name: Dict[str, List[Dict]] = {}
+        for ds in datasets:
+            self._by_name.setdefault((ds.get('name') or '').casefold(), []).append(ds)
+    
+    def matches(self, name: str) -> List[Dict]:
+        """All datasets with this name (more than one means the name is ambiguous)."""
+        return self._by_name.get(name.casefold(), [])
+    
+    def lookup(self, name: str) -> Optional[Dict]:
+        """First dataset with this name, or None."""
+        found = self.matches(name)
+        return found[0] if found else None
+    
+    def lookup_many(self, names: List[str]) -> Dict[str, Optional[Dict]]:
+        """lookup() for each name, keyed by the name as given."""
+        return {name: self.lookup(name) for name in names}
+    
+    def duplicates(self) -> Dict[str, List[Dict]]:
+        """Names shared by more than one dataset."""
+        return {name: found for name, found in self._by_name.items() if len(found) > 1}
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_dataset_name_index(instance: str, catalog_version: Optional[float]) -> DatasetNameIndex:
+    """Name index for an instance, rebuilt only when its catalog version changes."""
+    return DatasetNameIndex(get_dataset_catalog().load(instance))
+
+
+def get_current_name_index(instance: str) -> DatasetNameIndex:
+    return get_dataset_name_index(instance, get_dataset_catalog().version(instance))
+
+
+# =============================================================================
+# COPY CHECKPOINTS
+# =============================================================================
+
+class CopyCheckpoint:
+    """
+    Resume state of a pipelined stream copy, kept as a JSON file under CHECKPOINT_DIR.
+    
+    Records the source query (filter, page key, partitions), the open stream
+    execution and, per lane (partition), the last position whose parts have all
+    been acknowledged. Parts uploaded past that position are kept as the lane's
+    tail: a resumed run re-extracts from the position and re-uploads into those
+    same part numbers, and blanks any it no longer needs, so the execution never
+    holds a row twice. With path=None the state is only kept in memory.
+    """
+    
+    def __init__(self, path: Optional[str] = None, identity: Dict = None):
+        self.path = path
+        self.state = {'identity': identity or {}}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if saved.get('identity') == self.state['identity']:
+                    self.state = saved
+            except (OSError, ValueError):
+                pass
+        self.state.setdefault('lanes', {})
+        self.state.setdefault('next_part', 1)
+        # Parts a previous run left unconfirmed, reused in order before new numbers
+        self._reusable = {int(lane): deque(entry.get('tail', [])) for lane, entry in self.state['lanes'].items()}
+        self._pending = {}
+        self._acknowledged = set()
+    
+    @classmethod
+    def for_copy(cls, source_instance: str, source_dataset_id: str, target_instance: str,
+                 target_dataset_id: str, where_clause: str, page_key: str = None,
+                 keep_where: str = None) -> 'CopyCheckpoint':
+        """Open (or start) the checkpoint for one source query into one target dataset."""
+        identity = {
+            'source_instance': source_instance, 'source_dataset_id': source_dataset_id,
+            'target_instance': target_instance, 'target_dataset_id': target_dataset_id,
+            'where_clause': where_clause, 'page_key': page_key,
+        }
+        if keep_where:
+            identity['keep_where'] = keep_where
+        digest = hashlib.sha1(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+        return cls(os.path.join(CHECKPOINT_DIR, f"{digest}.json"), identity)
+    
+    @property
+    def execution_id(self) -> Optional[int]:
+        return self.state.get('execution_id')
+    
+    def get(self, name: str, default=None):
+        return self.state.get(name, default)
+    
+    def reset(self, **fields):
+        """Forget any previous progress and start over with the given query details."""
+        self.state = {'identity': self.state['identity'], 'lanes': {}, 'next_part': 1, **fields}
+        self._reusable = {}
+        self._pending = {}
+        self._acknowledged = set()
+    
+    def bind(self, stream_id: int, execution_id: int):
+        """Record the stream execution the parts go into."""
+        self.state.update(stream_id=stream_id, execution_id=execution_id)
+        self.save()
+    
+    def _lane(self, lane: int) -> Dict:
+        return self.state['lanes'].setdefault(str(lane), {'position': None, 'rows': 0, 'parts': 0, 'tail': []})
+    
+    def resume_positions(self) -> Dict[int, object]:
+        """Last fully uploaded position per lane, for iter_dataset_chunks(resume_from=...)."""
+        return {int(lane): entry['position'] for lane, entry in self.state['lanes'].items()
+                if entry['position'] is not None}
+    
+    def rows_done(self, lane: int = None) -> int:
+        """Rows acknowledged so far, in one lane or in all of them."""
+        if lane is not None:
+            return self.state['lanes'].get(str(lane), {}).get('rows', 0)
+        return sum(entry['rows'] for entry in self.state['lanes'].values())
+    
+    def allocate(self, lane: int, position, rows: int) -> int:
+        """Pick the part number for a chunk that ends at position in lane."""
+        reusable = self._reusable.get(lane)
+        if reusable:
+            part_num = reusable.popleft()
+        else:
+            part_num = self.state['next_part']
+            self.state['next_part'] += 1
+        self._pending.setdefault(lane, deque()).append((part_num, position, rows))
+        self._sync_tail(lane)
+        # Saved before the upload starts, so an interrupted part is always in some tail
+        self.save()
+        return part_num
+    
+    def acknowledge(self, part_num: int):
+        """Mark a part as uploaded and advance its lane past every acknowledged chunk."""
+        self._acknowledged.add(part_num)
+        for lane, pending in self._pending.items():
+            # Find the furthest acknowledged prefix chunk that ends at a resumable position;
+            # chunks ending mid tie-group stay in the tail until a later one gives a position
+            through = None
+            for i, (pending_part, position, _) in enumerate(pending):
+                if pending_part not in self._acknowledged:
+                    break
+                if position is not None:
+                    through = i
+            if through is None:
+                continue
+            
+            entry = self._lane(lane)
+            for _ in range(through + 1):
+                done_part, position, rows = pending.popleft()
+                self._acknowledged.discard(done_part)
+                entry['rows'] += rows
+                entry['parts'] += 1
+            entry['position'] = position
+            self._sync_tail(lane)
+            self.save()
+    
+    def _sync_tail(self, lane: int):
+        self._lane(lane)['tail'] = ([p for p, _, _ in self._pending.get(lane, ())]
+                                    + list(self._reusable.get(lane, ())))
+    
+    def leftover_parts(self) -> List[int]:
+        """Parts from a previous run that this run did not overwrite (to be blanked)."""
+        return [part_num for reusable in self._reusable.values() for part_num in reusable]
+    
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.path)
+    
+    def stale_checkpoints(self) -> List['CopyCheckpoint']:
+        """
+        Other saved checkpoints no run will resume: those for the same source and target
+        with another filter, once idle for CHECKPOINT_SUPERSEDED_SECONDS, and any idle
+        for CHECKPOINT_MAX_AGE_SECONDS.
+        """
+        if not self.path or not os.path.isdir(CHECKPOINT_DIR):
+            return []
+        pair = ('source_instance', 'source_dataset_id', 'target_instance', 'target_dataset_id')
+        identity = self.state['identity']
+        now = time.time()
+        stale = []
+        for name in os.listdir(CHECKPOINT_DIR):
+            path = os.path.join(CHECKPOINT_DIR, name)
+            if not name.endswith('.json') or os.path.abspath(path) == os.path.abspath(self.path):
+                continue
+            try:
+                idle = now - os.path.getmtime(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    other = json.load(f).get('identity', {})
+            except (OSError, ValueError):
+                continue
+            same_pair = all(other.get(k) == identity.get(k) for k in pair)
+            if idle > CHECKPOINT_MAX_AGE_SECONDS or (same_pair and idle > CHECKPOINT_SUPERSEDED_SECONDS):
+                stale.append(CopyCheckpoint(path, other))
+        return stale
+    
+    def discard(self):
+        """Delete the checkpoint once the copy is committed or abandoned."""
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+# =============================================================================
+# EXTRACT CACHE
+# =============================================================================
+
+class ExtractCache:
+    """
+    Local Parquet snapshots of source extracts, evicted least-recently-used.
+    
+    An entry is keyed by instance, dataset id, filter, columns and the source's
+    updatedAt, so any change to the source makes it unreachable. Values are
+    stored as text, exactly as they are written to CSV; readers that need typed
+    values restore them from the schema (see apply_schema_dtypes). Needs pyarrow;
+    without it the cache is disabled.
+    """
+    
+    def __init__(self, path: str = EXTRACT_CACHE_DIR, max_bytes: int = EXTRACT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            import pyarrow  # noqa: F401
+            self.enabled = max_bytes > 0
+        except ImportError:
+            self.enabled = False
+    
+    @staticmethod
+    def key(instance: str, dataset_id: str, where_clause: str, columns: List[str], updated_at) -> Optional[str]:
+        if not updated_at:
+            return None
+        identity = json.dumps([instance, dataset_id, where_clause, columns, str(updated_at)])
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.parquet")
+    
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Path of a cached extract (marking it recently used), or None."""
+        if not self.enabled or not key:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            os.utime(entry_path)
+        except OSError:
+            return None
+        return entry_path
+    
+    def row_count(self, entry_path: str) -> int:
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(entry_path).metadata.num_rows
+    
+    def iter_chunks(self, entry_path: str, chunk_rows: int = EXTRACT_CACHE_BATCH_ROWS,
+                    cancel_check=None) -> Iterator[tuple]:
+        """Yield a cached extract like iter_dataset_chunks does (without resume positions)."""
+        import pyarrow.parquet as pq
+        
+        parquet = pq.ParquetFile(entry_path)
+        columns = parquet.schema_arrow.names
+        offset = 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows):
+            if cancel_check and cancel_check():
+                raise Exception("Operation cancelled by user")
+            rows = [list(row) for row in zip(*(column.to_pylist() for column in batch.columns))]
+            yield offset, columns, rows, (0, None)
+            offset += len(rows)
+    
+    def capture(self, key: Optional[str], columns: List[str], chunks, expected_bytes: int = 0) -> Iterator[tuple]:
+        """
+        Pass chunks through while writing them to the cache. The entry is only
+        kept if the iteration runs to completion. Extracts expected to exceed
+        max_bytes are not written at all, and writing stops (the partial file is
+        deleted) once the entry grows past max_bytes.
+        """
+        if not self.enabled or not key or expected_bytes > self.max_bytes:
+            yield from chunks
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        os.makedirs(self.path, exist_ok=True)
+        schema = pa.schema([(name, pa.string()) for name in columns])
+        temp_path = f"{self._entry_path(key)}.{uuid.uuid4().hex[:8]}.tmp"
+        writer = pq.ParquetWriter(temp_path, schema, compression='zstd')
+        complete = False
+        try:
+            for chunk in chunks:
+                _, chunk_columns, rows, _ = chunk
+                if writer and list(chunk_columns) != list(columns):
+                    # Unexpected column layout; keep copying but do not cache
+                    writer.close()
+                    writer = None
+                if writer and rows:
+                    writer.write_table(pa.table(
+                        [[None if v is None else str(v) for v in column] for column in zip(*rows)], schema=schema
+                    ))
+                    if os.path.getsize(temp_path) > self.max_bytes:
+                        # Too big to ever fit; stop paying for the conversion
+                        writer.close()
+                        writer = None
+                yield chunk
+            complete = writer is not None
+        finally:
+            chunks.close()
+            if writer:
+                writer.close()
+            if complete:
+                os.replace(temp_path, self._entry_path(key))
+                self.evict(key)
+            elif os.path.exists(temp_path):
+                os.unlink(temp_path)
+    
+    def evict(self, new_key: Optional[str] = None):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        A new_key entry that alone exceeds max_bytes is dropped instead.
+        """
+        with self._lock:
+            if new_key:
+                new_path = self._entry_path(new_key)
+                try:
+                    if os.path.getsize(new_path) > self.max_bytes:
+                        os.unlink(new_path)
+                        return
+                except OSError:
+                    pass
+            entries = []
+            for name in os.listdir(self.path):
+                if name.endswith('.parquet'):
+                    try:
+                        stat = os.stat(os.path.join(self.path, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(os.path.join(self.path, name))
+                    total -= size
+                except OSError:
+                    pass
+
+
+@st.cache_resource(show_spinner=False)
+def get_extract_cache() -> ExtractCache:
+    return ExtractCache()
+
+
+# =============================================================================
+# COPY JOBS
+# =============================================================================
+
+def copy_dataset_to_dev(source_dataset_id: str, target_dataset_name: str, date_column: str = None,
+                        start_date=None, end_date=None, page_key: str = None,
+                        source_info: Dict = None, target_dataset: Optional[Dict] = None,
+                        progress_callback=None, status_callback=None, cancel_check=None,
+                        delta: bool = False, force: bool = False, replace_range: bool = False) -> Dict:
+    """
+    Copy one production dataset into dev, replacing target_dataset's data or creating a new dataset.
+    
+    Datasets over 500k rows are streamed; smaller ones are exported and uploaded in one go.
+    With delta, only rows whose date_column is later than the latest one already in
+    target_dataset (up to end_date) are streamed and appended; a full copy is made if
+    it is empty. Rows that reach production later for dates already in dev are not
+    picked up; a replace_range copy of those days refreshes them.
+    With replace_range, only the start_date..end_date slice of target_dataset is
+    replaced and its other rows are kept (always streamed).
+    Unless force is set, a copy is skipped (mode 'up_to_date') when the last successful
+    copy into target_dataset was of the same source and filter, and the source's
+    updatedAt and row count have not changed since.
+    progress_callback(fraction, text) and status_callback(message) report progress.
+    Returns {'dataset_id', 'rows', 'created', 'mode'}.
+    """
+    def progress(pct, text):
+        if progress_callback:
+            progress_callback(pct, text)
+    
+    def status(msg):
+        if status_callback:
+            status_callback(msg)
+    
+    def stream_progress(current, total):
+        pct = min(0.1 + (current / max(total, 1)) * 0.85, 0.95)
+        progress(pct, f"Streaming: {current:,} / {total:,} rows...")
+    
+    started_at = time.time()
+    catalog = get_dataset_catalog()
+    filter_key = json.dumps([date_column, str(start_date) if start_date else None,
+                             str(end_date) if end_date else None, bool(delta), bool(replace_range)])
+    
+    if target_dataset and not force:
+        # Compare against the source as it is now, not as the page loaded it
+        source_info = get_dataset_info(PROD_INSTANCE, source_dataset_id)
+        # Any later copy into the target, with another source or filter, changed its contents
+        last = catalog.last_copy(target_dataset.get('id'))
+        if (last and last['source_id'] == source_dataset_id and last['filter'] == filter_key
+                and last['source_updated_at'] == source_info.get('updatedAt')
+                and last['source_rows'] == source_info.get('rows')):
+            status(f"Already up to date: unchanged since the copy of "
+                   f"{datetime.fromtimestamp(last['started_at']).strftime('%Y-%m-%d %H:%M')}")
+            progress(1.0, "Already up to date")
+            return {'dataset_id': target_dataset.get('id'), 'rows': last['rows'], 'created': False, 'mode': 'up_to_date'}
+    
+    source_info = source_info or get_dataset_info(PROD_INSTANCE, source_dataset_id)
+    schema = source_info.get('schema', {}).get('columns', [])
+    
+    def finish(result: Dict) -> Dict:
+        catalog.record_copy(
+            source_dataset_id, filter_key, source_info.get('updatedAt'), source_info.get('rows'),
+            result['dataset_id'], result['rows'], result['mode'], started_at, time.time() - started_at
+        )
+        return result
+    
+    # Delta: append only the rows newer than the dev copy's date watermark
+    if delta:
+        if not (target_dataset and date_column):
+            raise Exception("Delta copies need an existing dev dataset and a date column")
+        progress(0.05, "Reading the dev copy's watermark...")
+        watermark = get_column_max(DEV_INSTANCE, target_dataset.get('id'), date_column)
+        if watermark is None:
+            status("Dev dataset is empty; making a full copy instead")
+        else:
+            status(f"Appending rows where {date_column} > {watermark}...")
+            total_copied = stream_copy_dataset(
+                source_instance=PROD_INSTANCE,
+                source_dataset_id=source_dataset_id,
+                target_instance=DEV_INSTANCE,
+                target_dataset_id=target_dataset.get('id'),
+                date_column=date_column,
+                end_date=end_date,
+                progress_callback=stream_progress,
+                status_callback=status,
+                cancel_check=cancel_check,
+                page_key=page_key,
+                after=watermark,
+                append=True
+            )
+            return finish({'dataset_id': target_dataset.get('id'), 'rows': total_copied, 'created': False, 'mode': 'delta'})
+    
+    # Range replace: swap the dev dataset's rows in the date range for production's
+    if replace_range and target_dataset:
+        if not (date_column and start_date and end_date):
+            raise Exception("Replacing a date range needs a date column, start date and end date")
+        progress(0.05, "Preparing date range replace...")
+        status(f"Replacing rows where {date_column} is between {start_date} and {end_date}...")
+        total_copied = stream_copy_dataset(
+            source_instance=PROD_INSTANCE,
+            source_dataset_id=source_dataset_id,
+            target_instance=DEV_INSTANCE,
+            target_dataset_id=target_dataset.get('id'),
+            date_column=date_column,
+            start_date=start_date,
+            end_date=end_date,
+            progress_callback=stream_progress,
+            status_callback=status,
+            cancel_check=cancel_check,
+            page_key=page_key,
+            replace_range=True
+        )
+        return finish({'dataset_id': target_dataset.get('id'), 'rows': total_copied, 'created': False, 'mode': 'range'})
+    
+    # Get row count to decide on copy method
+    row_count = source_info.get('rows', 0)
+    
+    # For large datasets (> 500k rows), use streaming
+    if row_count > 500000:
+        progress(0.05, "Preparing streaming copy...")
+        status(f"Large dataset detected ({row_count:,} rows). Using streaming mode...")
+        
+        # Step 1: Create or get target dataset
+        if target_dataset:
+            new_dataset_id = target_dataset.get('id')
+            status(f"Using existing dataset: {new_dataset_id}")
+        else:
+            status("Creating new dataset in development instance...")
+            new_dataset_id = create_dataset(DEV_INSTANCE, target_dataset_name, schema).get('id')
+        
+        # Step 2: Stream copy
+        total_copied = stream_copy_dataset(
+            source_instance=PROD_INSTANCE,
+            source_dataset_id=source_dataset_id,
+            target_instance=DEV_INSTANCE,
+            target_dataset_id=new_dataset_id,
+            date_column=date_column,
+            start_date=start_date,
+            end_date=end_date,
+            progress_callback=stream_progress,
+            status_callback=status,
+            cancel_check=cancel_check,
+            page_key=page_key
+        )
+        return finish({'dataset_id': new_dataset_id, 'rows': total_copied, 'created': not target_dataset, 'mode': 'streaming'})
+    
+    # For smaller datasets, use the original method
+    # Step 1: Export data from prod
+    progress(0.1, "Exporting data from Production...")
+    status("Downloading data from production instance...")
+    
+    def export_progress(current, total):
+        pct = min(0.1 + (current / max(total, 1)) * 0.4, 0.5)
+        progress(pct, f"Exporting: {current:,} / {total:,} rows...")
+    
+    # Pass date filter to export function for server-side filtering
+    df = export_dataset_data(
+        PROD_INSTANCE,
+        source_dataset_id,
+        date_column=date_column,
+        start_date=start_date,
+        end_date=end_date,
+        progress_callback=export_progress if row_count > 100000 else None,
+        page_key=page_key,
+        cancel_check=cancel_check,
+        status_callback=status
+    )
+    status(f"Exported {len(df):,} rows")
+    
+    if cancel_check and cancel_check():
+        raise Exception("Operation cancelled by user")
+    
+    # Step 2: Create dataset in dev OR use existing
+    if target_dataset:
+        progress(0.5, "Using existing dataset in Development...")
+        status(f"Found existing dataset: {target_dataset.get('id')}")
+        new_dataset_id = target_dataset.get('id')
+    else:
+        progress(0.5, "Creating dataset in Development...")
+        status("Creating new dataset in development instance...")
+        new_dataset_id = create_dataset(DEV_INSTANCE, target_dataset_name, schema).get('id')
+    
+    # Step 3: Upload data
+    progress(0.6, "Uploading data to Development...")
+    status(f"Uploading {len(df):,} rows to dev instance...")
+    
+    def upload_progress(current, total):
+        pct = min(0.6 + (current / max(total, 1)) * 0.35, 0.95)
+        progress(pct, f"Uploading: {current:,} / {total:,} rows...")
+    
+    upload_data_to_dataset(DEV_INSTANCE, new_dataset_id, df, progress_callback=upload_progress if len(df) > 100000 else None,
+                           cancel_check=cancel_check)
+    return finish({'dataset_id': new_dataset_id, 'rows': len(df), 'created': not target_dataset, 'mode': 'export'})
+
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+class CopyJob:
+    """
+    A copy running on a worker thread, decoupled from the Streamlit script run.
+    
+    The worker reports its latest progress and status message, which pages poll
+    (see render_copy_job). Several sessions can follow one job (see
+    CopyJobRunner.submit); it is cancelled, at the next request boundary, once
+    every one of them has cancelled.
+    """
+    
+    def __init__(self, label: str, params: Dict, owner: str = '', key: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.params = params
+        self.owner = owner
+        self.key = key
+        self.subscribers = {owner}
+        self.status = 'queued'
+        self.progress = (0.0, "Queued...")
+        self.message = ""
+        self.result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+    
+    def report_progress(self, pct: float, text: str):
+        self.progress = (pct, text)
+    
+    def report_status(self, message: str):
+        self.message = message
+    
+    def attach(self, owner: str):
+        with self._lock:
+            self.subscribers.add(owner)
+    
+    def cancel(self, owner: str = None):
+        """Stop following the job as owner; the copy itself stops when nobody follows it."""
+        with self._lock:
+            if owner is not None:
+                self.subscribers.discard(owner)
+            if owner is None or not self.subscribers:
+                self._cancel.set()
+    
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+    
+    @property
+    def done(self) -> bool:
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+
+class CopyJobRunner:
+    """
+    Process-wide pool running CopyJobs; survives reruns and closed browser tabs.
+    
+    Jobs submitted with a key are single-flight: while one is unfinished, submitting
+    the same key attaches to it instead of starting the work again.
+    """
+    
+    def __init__(self, max_workers: int = BACKGROUND_JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="copy-job")
+        self._jobs: Dict[str, CopyJob] = {}
+        self._in_flight: Dict[str, CopyJob] = {}
+        self._lock = threading.Lock()
+    
+    def _run(self, job: CopyJob, work):
+        set_request_owner(job.owner)
+        if job.is_cancelled():
+            job.status = 'cancelled'
+        else:
+            job.status = 'running'
+            try:
+                job.result = work(job)
+                job.status = 'succeeded'
+            except Exception as e:
+                job.error = e
+                job.status = 'cancelled' if job.is_cancelled() or "cancelled" in str(e).lower() else 'failed'
+        job.finished_at = time.time()
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+    
+    def submit(self, label: str, params: Dict, work, owner: str = '', key: str = None) -> CopyJob:
+        """
+        Run work(job) in the background on behalf of owner and return the job handle,
+        or return the unfinished job already running under key, with owner attached.
+        """
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            running = self._in_flight.get(key) if key is not None else None
+            if running is not None and not running.done and not running.is_cancelled():
+                running.attach(owner)
+                return running
+            
+            job = CopyJob(label, params, owner, key)
+            for old_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < cutoff]:
+                del self._jobs[old_id]
+            self._jobs[job.id] = job
+            if key is not None:
+                self._in_flight[key] = job
+        self._executor.submit(self._run, job, work)
+        return job
+    
+    def get(self, job_id: str) -> Optional[CopyJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def queue_position(self, job: CopyJob) -> Optional[int]:
+        """1-based place of a job still waiting for a worker thread, or None once it started."""
+        with self._lock:
+            queued = sorted((j for j in self._jobs.values() if j.status == 'queued'), key=lambda j: j.created_at)
+        return queued.index(job) + 1 if job in queued else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner() -> CopyJobRunner:
+    return CopyJobRunner()
+
+
+def copy_job_key(copy_args: Dict) -> str:
+    """Identity of a copy for single-flight: source dataset, filter, mode and target dataset."""
+    target = copy_args.get('target_dataset') or {}
+    return json.dumps([
+        copy_args['source_dataset_id'],
+        copy_args.get('date_column'),
+        str(copy_args.get('start_date')),
+        str(copy_args.get('end_date')),
+        bool(copy_args.get('delta')),
+        bool(copy_args.get('replace_range')),
+        bool(copy_args.get('force')),
+        target.get('id') or copy_args['target_dataset_name'].casefold(),
+    ])
+
+
+def start_copy_job(label: str, **copy_args) -> CopyJob:
+    """
+    Start copy_dataset_to_dev in the background, reporting to the job and wired to its cancel flag.
+    Its requests queue for API capacity as the calling browser session. If an identical
+    copy is already running, the session follows that job instead.
+    """
+    def work(job: CopyJob):
+        return copy_dataset_to_dev(
+            progress_callback=job.report_progress,
+            status_callback=job.report_status,
+            cancel_check=job.is_cancelled,
+            **copy_args
+        )
+    return get_job_runner().submit(label, copy_args, work, owner=current_session_id(),
+                                   key=copy_job_key(copy_args))
+
+
+# =============================================================================
+# BATCH COPY (HEADLESS)
+# =============================================================================
+
+class BatchScheduler:
+    """
+    Run copy jobs on worker threads, lowest (priority, source rows) first.
+    
+    Every job reads from PROD_INSTANCE and writes to DEV_INSTANCE and holds one
+    slot of each instance's limit while it runs.
+    """
+    
+    def __init__(self, limits: Dict[str, int] = None):
+        self.limits = dict(limits or BATCH_MAX_CONCURRENT_COPIES)
+        self._slots = {instance: threading.Semaphore(n) for instance, n in self.limits.items()}
+    
+    def run(self, jobs: List[Dict], run_job) -> List[Dict]:
+        """Run run_job(job) for every job; returns one result dict per job, in manifest order."""
+        pending = queue.PriorityQueue()
+        for index, job in enumerate(jobs):
+            pending.put((job.get('priority', 0), job.get('source_rows') or 0, index))
+        results = [None] * len(jobs)
+        instances = sorted(self.limits)
+        
+        def worker():
+            while True:
+                try:
+                    _, _, index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                # Acquire instance slots in a fixed order so jobs never deadlock
+                for instance in instances:
+                    self._slots[instance].acquire()
+                started = time.monotonic()
+                try:
+                    result = {'status': 'ok', **run_job(jobs[index])}
+                except Exception as e:
+                    result = {'status': 'failed', 'error': str(e)}
+                finally:
+                    for instance in reversed(instances):
+                        self._slots[instance].release()
+                result['seconds'] = round(time.monotonic() - started, 1)
+                results[index] = {**jobs[index], **result}
+        
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(self.limits.values()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+
+def load_batch_manifest(path: str) -> List[Dict]:
+    """
+    Read a JSON manifest: a list (or {"copies": [...]}) of entries with
+    source_id or source_name, and optional target_name, date_column,
+    start_date/end_date (YYYY-MM-DD) or last_days, page_key, priority,
+    delta (append only rows newer than the dev copy), replace_range (replace only
+    the date range in the dev copy) and force (copy even if unchanged).
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    entries = manifest.get('copies', []) if isinstance(manifest, dict) else manifest
+    
+    jobs = []
+    for entry in entries:
+        if not entry.get('source_id') and not entry.get('source_name'):
+            raise ValueError(f"Manifest entry needs source_id or source_name: {entry}")
+        job = dict(entry)
+        if job.get('last_days'):
+            job['end_date'] = datetime.now().date()
+            job['start_date'] = job['end_date'] - timedelta(days=int(job['last_days']))
+        jobs.append(job)
+    return jobs
+
+
+def run_batch_cli(argv: List[str]) -> int:
+    """Headless entry point: `python -m app manifest.json`. Returns the process exit code."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="python -m app", description="Copy datasets from production to development in batch.")
+    parser.add_argument("manifest", help="JSON manifest of datasets to copy")
+    parser.add_argument("--max-prod", type=int, default=BATCH_MAX_CONCURRENT_COPIES[PROD_INSTANCE],
+                        help="max concurrent copies reading from production")
+    parser.add_argument("--max-dev", type=int, default=BATCH_MAX_CONCURRENT_COPIES[DEV_INSTANCE],
+                        help="max concurrent copies writing to development")
+    parser.add_argument("--report", help="also write the summary report as JSON to this path")
+    parser.add_argument("--force", action="store_true",
+                        help="copy every dataset even if unchanged since its last successful copy")
+    args = parser.parse_args(argv)
+    
+    jobs = load_batch_manifest(args.manifest)
+    
+    for instance in (PROD_INSTANCE, DEV_INSTANCE):
+        sync_catalog(instance)
+    prod_catalog = {ds['id']: ds for ds in get_dataset_catalog().load(PROD_INSTANCE)}
+    prod_index = get_current_name_index(PROD_INSTANCE)
+    
+    # Resolve sources up front so ordering can use catalog row counts
+    source_names = [job['source_name'] for job in jobs if not job.get('source_id')]
+    sources_by_name = prod_index.lookup_many(source_names)
+    for job in jobs:
+        if not job.get('source_id'):
+            found = sources_by_name[job['source_name']]
+            job['source_id'] = found.get('id') if found else None
+        source = prod_catalog.get(job['source_id']) or {}
+        job.setdefault('source_name', source.get('name'))
+        job.setdefault('target_name', job.get('source_name'))
+        job['source_rows'] = source.get('rows')
+    
+    create_lock = threading.Lock()
+    created_targets = {}
+    
+    def run_job(job):
+        set_request_owner(f"batch:{job['target_name']}")
+        if not job.get('source_id'):
+            raise ValueError(f"Dataset not found in {PROD_INSTANCE}: {job.get('source_name')}")
+        source_info = get_dataset_info(PROD_INSTANCE, job['source_id'])
+        
+        # Resolve or create the target under a lock so two entries never create the same dataset
+        with create_lock:
+            name_key = job['target_name'].casefold()
+            target = get_current_name_index(DEV_INSTANCE).lookup(job['target_name']) or created_targets.get(name_key)
+            created = target is None
+            if created:
+                schema = source_info.get('schema', {}).get('columns', [])
+                target = created_targets[name_key] = create_dataset(DEV_INSTANCE, job['target_name'], schema)
+        
+        prefix = f"[{job['target_name']}]"
+        result = copy_dataset_to_dev(
+            job['source_id'], job['target_name'],
+            date_column=job.get('date_column'),
+            start_date=job.get('start_date'),
+            end_date=job.get('end_date'),
+            page_key=job.get('page_key'),
+            source_info=source_info,
+            target_dataset=target,
+            delta=bool(job.get('delta')),
+            force=args.force or bool(job.get('force')),
+            replace_range=bool(job.get('replace_range')),
+            status_callback=lambda msg: print(f"{prefix} {msg}", flush=True)
+        )
+        result['created'] = created
+        return result
+    
+    print(f"Copying {len(jobs)} dataset(s) from {PROD_INSTANCE} to {DEV_INSTANCE}...", flush=True)
+    started = time.monotonic()
+    scheduler = BatchScheduler({PROD_INSTANCE: args.max_prod, DEV_INSTANCE: args.max_dev})
+    results = scheduler.run(jobs, run_job)
+    elapsed = time.monotonic() - started
+    
+    # Summary report
+    failed = [r for r in results if r['status'] != 'ok']
+    print("")
+    print(f"{'STATUS':<8} {'ROWS':>12} {'SECONDS':>9}  TARGET")
+    for r in results:
+        rows = format_row_count(r.get('rows')) if r['status'] == 'ok' else '-'
+        status = 'CURRENT' if r.get('mode') == 'up_to_date' else r['status'].upper()
+        print(f"{status:<8} {rows:>12} {r['seconds']:>9}  {r.get('target_name')}")
+        if r['status'] != 'ok':
+            print(f"{'':<8} {r['error']}")
+    current = [r for r in results if r.get('mode') == 'up_to_date']
+    total_rows = sum(r.get('rows') or 0 for r in results if r['status'] == 'ok' and r.get('mode') != 'up_to_date')
+    print(f"\n{len(results) - len(failed) - len(current)} copied, {len(current)} already up to date, {len(failed)} failed, "
+          f"{format_row_count(total_rows)} rows in {elapsed:,.0f}s")
+    
+    # Names shared by several datasets; the batch used the first match for each
+    prod_duplicates = prod_index.duplicates()
+    dev_duplicates = get_current_name_index(DEV_INSTANCE).duplicates()
+    ambiguous = {
+        PROD_INSTANCE: sorted({name for name in source_names if name.casefold() in prod_duplicates}),
+        DEV_INSTANCE: sorted({job['target_name'] for job in jobs
+                              if job['target_name'] and job['target_name'].casefold() in dev_duplicates}),
+    }
+    for instance, names in ambiguous.items():
+        if names:
+            print(f"Ambiguous {instance} dataset names (first match used): {', '.join(names)}")
+    
+    request_metrics = get_request_metrics()
+    for instance, m in request_metrics.items():
+        print(f"{instance}: {m['requests']:,} requests, {m['retries']:,} retries "
+              f"({m['throttled']} throttled, {m['server_errors']} server errors, "
+              f"{m['connection_errors']} connection errors), {m['gave_up']} gave up, "
+              f"{m['wait_seconds']:,}s queued for admission or the rate limit")
+    
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed_seconds': round(elapsed, 1), 'results': results, 'requests': request_metrics,
+                       'ambiguous_names': ambiguous}, f, indent=2, default=str)
+    
+    return 1 if failed else 0
+
+
 # =============================================================================
 # UI COMPONENTS
 # =============================================================================
@@ -1101,6 +3595,104 @@ def render_schema_preview(schema: List[Dict], date_columns: List[str]):
         """, unsafe_allow_html=True)
 
 
+def render_request_metrics():
+    """Show API request, retry and throttling counters per instance."""
+    with st.expander("API Requests"):
+        rows = [{'Instance': instance, **metrics} for instance, metrics in get_request_metrics().items()]
+        st.dataframe(pd.DataFrame(rows).rename(columns={
+            'requests': 'Requests', 'retries': 'Retries', 'throttled': '429s', 'server_errors': '5xx',
+            'connection_errors': 'Connection errors', 'gave_up': 'Gave up', 'wait_seconds': 'Queued (s)',
+        }), hide_index=True, use_container_width=True)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_copy_job_progress(job_id: str):
+    """Live progress of a running job; only this fragment reruns while it polls."""
+    job = get_job_runner().get(job_id)
+    session_id = current_session_id()
+    if job is None or job.done or session_id not in job.subscribers:
+        # Rerun the whole page to show the outcome and re-enable the copy button
+        st.rerun()
+    
+    pct, text = job.progress
+    st.progress(pct, text)
+    if job.message:
+        st.info(job.message)
+    position = get_job_runner().queue_position(job)
+    if position:
+        ahead = "next in line" if position == 1 else f"{position - 1} other copies ahead"
+        st.caption(f"Waiting for a free copy worker ({ahead})")
+    for instance in (PROD_INSTANCE, DEV_INSTANCE):
+        position = get_admission_controller(instance).queue_position(job.owner)
+        if position:
+            ahead = "next in line" if position == 1 else f"{position - 1} other session(s) ahead"
+            st.caption(f"Waiting for {instance} API capacity ({ahead})")
+    if len(job.subscribers) > 1:
+        st.caption(f"Shared with {len(job.subscribers) - 1} other session(s) that requested the same copy")
+    if job.is_cancelled():
+        st.caption("Cancelling...")
+    elif st.button("Cancel", key=f"cancel_{job.id}", use_container_width=True):
+        job.cancel(session_id)
+        st.rerun()
+
+
+def render_copy_job(job: CopyJob):
+    """Show a background copy job's progress (polled in a fragment) or its outcome."""
+    if not job.done:
+        render_copy_job_progress(job.id)
+        return
+    
+    target_name = job.params.get('target_dataset_name')
+    if job.status == 'succeeded':
+        result = job.result
+        if result['mode'] == 'up_to_date':
+            st.markdown(f"""
+            <div class="alert alert-info">
+                <span class="alert-title">Already Up to Date</span><br/>
+                The production dataset has not changed since the last copy into <strong>{target_name}</strong> ({result['rows']:,} rows).<br/>
+                Tick "Force copy even if unchanged" to copy it again.
+            </div>
+            """, unsafe_allow_html=True)
+            return
+        if result['mode'] == 'delta':
+            action_text = "New Rows Appended"
+        elif result['mode'] == 'range':
+            action_text = "Date Range Replaced"
+        else:
+            action_text = "Data Replaced" if not result['created'] else "Dataset Created"
+        mode_line = {
+            'streaming': "<strong>Mode:</strong> Streaming (memory efficient)<br/>",
+            'delta': "<strong>Mode:</strong> Delta (rows newer than the dev copy)<br/>",
+            'range': "<strong>Mode:</strong> Date range replace (rows outside the range kept)<br/>",
+        }.get(result['mode'], "")
+        
+        st.markdown(f"""
+        <div class="alert alert-success">
+            <span class="alert-title">{action_text} Successfully</span><br/>
+            <strong>Name:</strong> {target_name}<br/>
+            <strong>Dataset ID:</strong> {result['dataset_id']}<br/>
+            <strong>Rows Copied:</strong> {result['rows']:,}<br/>
+            {mode_line}
+            <strong>Target:</strong> <span class="instance-badge instance-dev">DEV</span> {DEV_INSTANCE}
+        </div>
+        """, unsafe_allow_html=True)
+    elif job.status == 'cancelled':
+        st.markdown("""
+        <div class="alert alert-warning">
+            <span class="alert-title">Operation Cancelled</span><br/>
+            The copy operation was cancelled by user.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown(f"""
+        <div class="alert alert-error">
+            <span class="alert-title">Copy Failed</span><br/>
+            Error: {job.error}
+        </div>
+        """, unsafe_allow_html=True)
+        st.exception(job.error)
+
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
@@ -1115,6 +3707,7 @@ def main():
     
     apply_custom_css()
     render_header()
+    set_request_owner(current_session_id())
     
     # Load datasets from both instances
     try:
@@ -1157,12 +3750,14 @@ def main():
     
     with refresh_col:
         st.markdown("<div style='height: 0.5rem'></div>", unsafe_allow_html=True)
-        if st.button("Refresh", use_container_width=True, help="Refresh dataset lists from DOMO"):
+        if st.button("Refresh", use_container_width=True, help="Pull datasets changed in DOMO since the last sync"):
             list_datasets.clear()
             st.rerun()
     
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
     
+    dev_index = get_current_name_index(DEV_INSTANCE)
+    
     # Check if we have datasets
     if not prod_datasets:
         st.warning("No datasets found in Production instance")
@@ -1205,7 +3800,7 @@ def main():
             return
         
         # Check if exists in dev
-        exists_in_dev = check_dataset_exists_in_dev(dataset_info.get('name', ''), dev_datasets)
+        exists_in_dev = check_dataset_exists_in_dev(dataset_info.get('name', ''), dev_index)
         
         # Dataset name configuration
         st.markdown('<div class="section-title">Dataset Name</div>', unsafe_allow_html=True)
@@ -1233,7 +3828,13 @@ def main():
             """, unsafe_allow_html=True)
         
         # Check if the target name exists in dev
-        target_exists_in_dev = check_dataset_exists_in_dev(target_dataset_name, dev_datasets)
+        target_exists_in_dev = check_dataset_exists_in_dev(target_dataset_name, dev_index)
+        target_name_matches = dev_index.matches(target_dataset_name)
+        if len(target_name_matches) > 1:
+            st.warning(
+                f"{len(target_name_matches)} dev datasets are named \"{target_dataset_name}\". "
+                f"Data will be replaced in the first one ({target_exists_in_dev.get('id')})."
+            )
         
         st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
         
@@ -1258,22 +3859,75 @@ def main():
             with date_col2:
                 end_date = st.date_input("End", value=default_end, key="end_date")
             
-            st.markdown(f"""
-            <div class="alert alert-info">
-                <span class="alert-title">Date Filter Active</span><br/>
-                Only rows where <code>{selected_date_column}</code> is between <strong>{start_date}</strong> and <strong>{end_date}</strong> will be copied.
-            </div>
-            """, unsafe_allow_html=True)
+            delta_mode = target_exists_in_dev is not None and st.checkbox(
+                "Delta: append only rows newer than the dev copy",
+                value=False,
+                key="delta_mode",
+                help=f"Reads the latest {selected_date_column} already in dev and appends only newer production "
+                     f"rows (up to the end date) instead of replacing the dataset. Rows added in production "
+                     f"later for dates already in dev are not picked up; to refresh those days, run "
+                     f"\"Replace only this date range in dev\" over them."
+            )
+            range_mode = target_exists_in_dev is not None and not delta_mode and st.checkbox(
+                "Replace only this date range in dev",
+                value=False,
+                key="range_mode",
+                help=f"Replaces the dev rows whose {selected_date_column} falls in the range with production's "
+                     f"and keeps the rest, instead of replacing the whole dataset with the range. Every dev row "
+                     f"outside the range is read back and re-uploaded, so the time taken grows with the size "
+                     f"of the dev dataset, not of the range."
+            )
+            
+            if delta_mode:
+                st.markdown(f"""
+                <div class="alert alert-info">
+                    <span class="alert-title">Delta Copy</span><br/>
+                    Only rows where <code>{selected_date_column}</code> is later than the latest value in dev, up to <strong>{end_date}</strong>, will be appended. Late rows for dates already in dev need a date range replace.
+                </div>
+                """, unsafe_allow_html=True)
+            elif range_mode:
+                st.markdown(f"""
+                <div class="alert alert-info">
+                    <span class="alert-title">Date Range Replace</span><br/>
+                    Dev rows where <code>{selected_date_column}</code> is between <strong>{start_date}</strong> and <strong>{end_date}</strong> will be replaced with production's; all other dev rows are kept (and re-uploaded).
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.markdown(f"""
+                <div class="alert alert-info">
+                    <span class="alert-title">Date Filter Active</span><br/>
+                    Only rows where <code>{selected_date_column}</code> is between <strong>{start_date}</strong> and <strong>{end_date}</strong> will be copied.
+                </div>
+                """, unsafe_allow_html=True)
         else:
             selected_date_column = None
             start_date = None
             end_date = None
+            delta_mode = False
+            range_mode = False
             st.markdown("""
             <div class="alert alert-warning">
                 <span class="alert-title">No Date Columns Found</span><br/>
                 This dataset has no DATE/DATETIME columns. All data will be copied.
             </div>
             """, unsafe_allow_html=True)
+        
+        # Pagination key configuration
+        st.markdown('<div class="section-title">Pagination</div>', unsafe_allow_html=True)
+        
+        auto_key_label = f"Auto ({selected_date_column})" if selected_date_column else "None (OFFSET paging)"
+        page_key_options = [auto_key_label] + [col['name'] for col in schema if col['name'] != selected_date_column]
+        page_key_choice = st.selectbox(
+            "Pagination Key",
+            options=page_key_options,
+            key="page_key_select",
+            help="Sortable, ideally unique or monotonic column used to seek between chunks. "
+                 "Without a key, chunks are read with LIMIT/OFFSET."
+        )
+        page_key = None if page_key_choice == auto_key_label else page_key_choice
+        
+        st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+        render_request_metrics()
     
     with col_preview:
         st.markdown('<div class="section-title">Dataset Preview</div>', unsafe_allow_html=True)
@@ -1305,7 +3959,7 @@ def main():
         # Copy action
         st.markdown('<div class="section-title">Copy to Development</div>', unsafe_allow_html=True)
         
-        if target_exists_in_dev:
+        if target_exists_in_dev and not delta_mode and not range_mode:
             st.markdown(f"""
             <div class="alert alert-warning">
                 <span class="alert-title">Dataset Already Exists</span><br/>
@@ -1314,171 +3968,49 @@ def main():
             </div>
             """, unsafe_allow_html=True)
         
-        copy_button = st.button("Copy to Development", type="primary", use_container_width=True)
+        active_job = get_job_runner().get(st.session_state.get('copy_job_id', ''))
+        if active_job and not active_job.done and current_session_id() not in active_job.subscribers:
+            # This session cancelled a copy that other sessions still follow
+            active_job = None
+        copy_running = active_job is not None and not active_job.done
+        
+        force_copy = target_exists_in_dev is not None and st.checkbox(
+            "Force copy even if unchanged",
+            value=False,
+            key="force_copy",
+            help="By default a copy is skipped when the production dataset's last update and row count "
+                 "match the last successful copy with the same filter into this dataset."
+        )
+        
+        copy_button = st.button("Copy to Development", type="primary", use_container_width=True,
+                                disabled=copy_running)
         
         if copy_button:
-            # Initialize cancel state
-            if 'cancel_copy' not in st.session_state:
-                st.session_state.cancel_copy = False
-            st.session_state.cancel_copy = False
-            
-            progress_placeholder = st.empty()
-            status_placeholder = st.empty()
-            cancel_placeholder = st.empty()
-            
-            # Show cancel button
-            if cancel_placeholder.button("Cancel", key="cancel_btn", use_container_width=True):
-                st.session_state.cancel_copy = True
-            
-            def check_cancelled():
-                return st.session_state.get('cancel_copy', False)
-            
-            try:
-                # Get row count to decide on copy method
-                row_count = dataset_info.get('rows', 0)
-                
-                # For large datasets (> 500k rows), use streaming
-                if row_count > 500000:
-                    progress_placeholder.progress(0.05, "Preparing streaming copy...")
-                    status_placeholder.info(f"Large dataset detected ({row_count:,} rows). Using streaming mode...")
-                    
-                    # Step 1: Create or get target dataset
-                    if target_exists_in_dev:
-                        new_dataset_id = target_exists_in_dev.get('id')
-                        status_placeholder.info(f"Using existing dataset: {new_dataset_id}")
-                    else:
-                        status_placeholder.info("Creating new dataset in development instance...")
-                        new_dataset = create_dataset(DEV_INSTANCE, target_dataset_name, schema)
-                        new_dataset_id = new_dataset.get('id')
-                    
-                    # Step 2: Stream copy
-                    def stream_progress(current, total):
-                        pct = min(0.1 + (current / total) * 0.85, 0.95)
-                        progress_placeholder.progress(pct, f"Streaming: {current:,} / {total:,} rows...")
-                    
-                    def stream_status(msg):
-                        status_placeholder.info(msg)
-                    
-                    total_copied = stream_copy_dataset(
-                        source_instance=PROD_INSTANCE,
-                        source_dataset_id=selected_ds_id,
-                        target_instance=DEV_INSTANCE,
-                        target_dataset_id=new_dataset_id,
-                        date_column=selected_date_column,
-                        start_date=start_date,
-                        end_date=end_date,
-                        progress_callback=stream_progress,
-                        status_callback=stream_status,
-                        cancel_check=check_cancelled
-                    )
-                    
-                    # Done!
-                    progress_placeholder.progress(1.0, "Complete!")
-                    status_placeholder.empty()
-                    cancel_placeholder.empty()
-                    
-                    action_text = "Data Replaced" if target_exists_in_dev else "Dataset Created"
-                    
-                    st.markdown(f"""
-                    <div class="alert alert-success">
-                        <span class="alert-title">{action_text} Successfully</span><br/>
-                        <strong>Name:</strong> {target_dataset_name}<br/>
-                        <strong>Dataset ID:</strong> {new_dataset_id}<br/>
-                        <strong>Rows Copied:</strong> {total_copied:,}<br/>
-                        <strong>Mode:</strong> Streaming (memory efficient)<br/>
-                        <strong>Target:</strong> <span class="instance-badge instance-dev">DEV</span> {DEV_INSTANCE}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                else:
-                    # For smaller datasets, use the original method
-                    # Step 1: Export data from prod
-                    progress_placeholder.progress(0.1, "Exporting data from Production...")
-                    status_placeholder.info(" Downloading data from production instance...")
-                    
-                    def export_progress(current, total):
-                        pct = min(0.1 + (current / total) * 0.4, 0.5)
-                        progress_placeholder.progress(pct, f"Exporting: {current:,} / {total:,} rows...")
-                    
-                    # Pass date filter to export function for server-side filtering
-                    df = export_dataset_data(
-                        PROD_INSTANCE, 
-                        selected_ds_id, 
-                        date_column=selected_date_column,
-                        start_date=start_date,
-                        end_date=end_date,
-                        progress_callback=export_progress if row_count > 100000 else None
-                    )
-                    original_count = len(df)
-                    
-                    status_placeholder.info(f"Exported {original_count:,} rows")
-                    
-                    time.sleep(0.5)
-                    
-                    # Step 2: Create dataset in dev OR use existing
-                    if target_exists_in_dev:
-                        progress_placeholder.progress(0.5, "Using existing dataset in Development...")
-                        status_placeholder.info(f"Found existing dataset: {target_exists_in_dev.get('id')}")
-                        new_dataset_id = target_exists_in_dev.get('id')
-                    else:
-                        progress_placeholder.progress(0.5, "Creating dataset in Development...")
-                        status_placeholder.info("Creating new dataset in development instance...")
-                        
-                        new_dataset = create_dataset(DEV_INSTANCE, target_dataset_name, schema)
-                        new_dataset_id = new_dataset.get('id')
-                    
-                    time.sleep(0.5)
-                    
-                    # Step 3: Upload data
-                    progress_placeholder.progress(0.6, "Uploading data to Development...")
-                    status_placeholder.info(f"Uploading {len(df):,} rows to dev instance...")
-                    
-                    def upload_progress(current, total):
-                        pct = min(0.6 + (current / total) * 0.35, 0.95)
-                        progress_placeholder.progress(pct, f"Uploading: {current:,} / {total:,} rows...")
-                    
-                    upload_data_to_dataset(DEV_INSTANCE, new_dataset_id, df, progress_callback=upload_progress if len(df) > 100000 else None)
-                    
-                    # Done!
-                    progress_placeholder.progress(1.0, "Complete!")
-                    status_placeholder.empty()
-                    cancel_placeholder.empty()
-                    
-                    action_text = "Data Replaced" if target_exists_in_dev else "Dataset Created"
-                    
-                    st.markdown(f"""
-                    <div class="alert alert-success">
-                        <span class="alert-title">{action_text} Successfully</span><br/>
-                        <strong>Name:</strong> {target_dataset_name}<br/>
-                        <strong>Dataset ID:</strong> {new_dataset_id}<br/>
-                        <strong>Rows Copied:</strong> {len(df):,}<br/>
-                        <strong>Target:</strong> <span class="instance-badge instance-dev">DEV</span> {DEV_INSTANCE}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-            except Exception as e:
-                progress_placeholder.empty()
-                status_placeholder.empty()
-                cancel_placeholder.empty()
-                
-                error_msg = str(e)
-                if "cancelled" in error_msg.lower():
-                    st.markdown("""
-                    <div class="alert alert-warning">
-                        <span class="alert-title">Operation Cancelled</span><br/>
-                        The copy operation was cancelled by user.
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="alert alert-error">
-                        <span class="alert-title">Copy Failed</span><br/>
-                        Error: {error_msg}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.exception(e)
+            # The copy runs on a background worker; this page only polls its progress
+            active_job = start_copy_job(
+                f"{dataset_info.get('name', selected_ds_id)} -> {target_dataset_name}",
+                source_dataset_id=selected_ds_id,
+                target_dataset_name=target_dataset_name,
+                date_column=selected_date_column,
+                start_date=start_date,
+                end_date=end_date,
+                page_key=page_key,
+                source_info=dataset_info,
+                target_dataset=target_exists_in_dev,
+                delta=delta_mode,
+                force=force_copy,
+                replace_range=range_mode
+            )
+            st.session_state.copy_job_id = active_job.id
+        
+        if active_job:
+            render_copy_job(active_job)
 
 
 if __name__ == "__main__":
-    if check_password():
-        main()
+    if st.runtime.exists():
+        if check_password():
+            main()
+    else:
+        # Not under `streamlit run`: headless batch mode
+        sys.exit(run_batch_cli(sys.argv[1:]))
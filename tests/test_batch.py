@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def catalogs(tmp_path, monkeypatch):
+    catalog = app.DatasetCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.replace_all(app.PROD_INSTANCE, [
+        {"id": "p1", "name": "Sales", "rows": 10},
+        {"id": "p2", "name": "sales", "rows": 20},
+        {"id": "p3", "name": "Orders", "rows": 30},
+    ])
+    catalog.replace_all(app.DEV_INSTANCE, [
+        {"id": "d1", "name": "Sales (Dev)"},
+        {"id": "d2", "name": "Sales (dev)"},
+        {"id": "d3", "name": "Orders"},
+    ])
+    copies = []
+
+    def copy_dataset_to_dev(source_id, target_name, target_dataset=None, **kwargs):
+        copies.append((source_id, target_dataset["id"]))
+        return {"dataset_id": target_dataset["id"], "rows": 1, "created": False, "mode": "export"}
+
+    monkeypatch.setattr(app, "sync_catalog", lambda instance: None)
+    monkeypatch.setattr(app, "get_dataset_catalog", lambda: catalog)
+    monkeypatch.setattr(app, "get_current_name_index", lambda instance: app.DatasetNameIndex(catalog.load(instance)))
+    monkeypatch.setattr(app, "get_dataset_info", lambda instance, dataset_id: {"id": dataset_id, "schema": {"columns": []}})
+    monkeypatch.setattr(app, "copy_dataset_to_dev", copy_dataset_to_dev)
+    return copies
+
+
+def test_batch_reports_names_that_matched_several_datasets(catalogs, tmp_path, capsys):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([
+        {"source_name": "SALES", "target_name": "sales (dev)"},
+        {"source_name": "Orders"},
+    ]))
+    report = tmp_path / "report.json"
+
+    assert app.run_batch_cli([str(manifest), "--report", str(report)]) == 0
+
+    assert sorted(catalogs) == [("p1", "d1"), ("p3", "d3")]
+    out = capsys.readouterr().out
+    assert f"Ambiguous {app.PROD_INSTANCE} dataset names (first match used): SALES" in out
+    assert f"Ambiguous {app.DEV_INSTANCE} dataset names (first match used): sales (dev)" in out
+    assert json.loads(report.read_text())["ambiguous_names"] == {
+        app.PROD_INSTANCE: ["SALES"], app.DEV_INSTANCE: ["sales (dev)"]
+    }
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import app
+
+
+def make_catalog(tmp_path):
+    return app.DatasetCatalog(str(tmp_path / "catalog.sqlite"))
+
+
+def filter_key(start=None, end=None):
+    return json.dumps(["Date", start, end, False, False])
+
+
+def record(catalog, source_id, filter_key, updated_at, started_at, target_id="t1", rows=100):
+    catalog.record_copy(source_id, filter_key, updated_at, rows, target_id, rows, "export", started_at, 1.0)
+
+
+def test_last_copy_is_none_without_history(tmp_path):
+    assert make_catalog(tmp_path).last_copy("t1") is None
+
+
+def test_last_copy_returns_latest_copy_into_target(tmp_path):
+    catalog = make_catalog(tmp_path)
+    record(catalog, "s1", filter_key(), "u1", started_at=1.0)
+    record(catalog, "s1", filter_key(), "u2", started_at=2.0)
+    record(catalog, "s1", filter_key(), "u3", started_at=3.0, target_id="t2")
+    
+    last = catalog.last_copy("t1")
+    assert last["source_id"] == "s1"
+    assert last["filter"] == filter_key()
+    assert last["source_updated_at"] == "u2"
+    assert last["rows"] == 100
+
+
+def test_last_copy_sees_copies_with_other_filters(tmp_path):
+    catalog = make_catalog(tmp_path)
+    record(catalog, "s1", filter_key(), "u1", started_at=1.0)
+    record(catalog, "s1", filter_key("2024-01-01", "2024-01-07"), "u1", started_at=2.0)
+    
+    # The full copy is no longer what the target holds
+    assert catalog.last_copy("t1")["filter"] == filter_key("2024-01-01", "2024-01-07")
+
+
+class CopyStarted(Exception):
+    pass
+
+
+def test_copy_skipped_only_when_target_last_got_the_same_copy(tmp_path, monkeypatch):
+    catalog = make_catalog(tmp_path)
+    monkeypatch.setattr(app, "get_dataset_catalog", lambda: catalog)
+    monkeypatch.setattr(app, "get_dataset_info", lambda instance, dataset_id: {"updatedAt": "u1", "rows": 100})
+    
+    def export_dataset_data(*args, **kwargs):
+        raise CopyStarted()
+    monkeypatch.setattr(app, "export_dataset_data", export_dataset_data)
+    
+    def copy(start=None, end=None):
+        return app.copy_dataset_to_dev("s1", "Target", "Date", start, end, target_dataset={"id": "t1"})
+    
+    record(catalog, "s1", json.dumps(["Date", None, None, False, False]), "u1", started_at=1.0)
+    assert copy()["mode"] == "up_to_date"
+    
+    # A one-week copy replaced the target since the full copy
+    record(catalog, "s1", json.dumps(["Date", "2024-01-01", "2024-01-07", False, False]), "u1", started_at=2.0)
+    with pytest.raises(CopyStarted):
+        copy()
+    assert copy("2024-01-01", "2024-01-07")["mode"] == "up_to_date"
+
+
+def test_upsert_makes_new_datasets_visible_without_moving_the_sync_watermark(tmp_path):
+    catalog = make_catalog(tmp_path)
+    catalog.replace_all("dev", [{"id": "d1", "name": "Sales", "updatedAt": "2024-01-01T00:00:00Z"}])
+    before = catalog.sync_state("dev")
+    
+    catalog.upsert("dev", [{"id": "d2", "name": "Sales Copy", "updatedAt": "2024-06-01T00:00:00Z"}])
+    
+    assert [ds["id"] for ds in catalog.load("dev")] == ["d1", "d2"]
+    after = catalog.sync_state("dev")
+    assert after["synced_at"] > before["synced_at"]
+    assert after["max_updated_at"] == before["max_updated_at"]
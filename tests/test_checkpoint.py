@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "CHECKPOINT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def open_checkpoint(where_clause="WHERE x", target="t1"):
+    return app.CopyCheckpoint.for_copy("prod", "s1", "dev", target, where_clause, "Date")
+
+
+def test_round_trip_resumes_after_acknowledged_parts(checkpoint_dir):
+    checkpoint = open_checkpoint()
+    checkpoint.reset(total_rows=30)
+    checkpoint.bind(7, 42)
+    first = checkpoint.allocate(0, {"key": "a"}, 10)
+    second = checkpoint.allocate(0, {"key": "b"}, 10)
+    third = checkpoint.allocate(0, {"key": "c"}, 10)
+    assert (first, second, third) == (1, 2, 3)
+    checkpoint.acknowledge(first)
+    checkpoint.acknowledge(third)  # Out of order: the lane cannot advance past part 2 yet
+    
+    reopened = open_checkpoint()
+    assert reopened.execution_id == 42
+    assert reopened.get("stream_id") == 7
+    assert reopened.get("total_rows") == 30
+    assert reopened.resume_positions() == {0: {"key": "a"}}
+    assert reopened.rows_done() == 10
+    assert reopened.rows_done(0) == 10
+    
+    # Unconfirmed parts are reused before new numbers, and unneeded ones are left over
+    assert reopened.allocate(0, {"key": "b"}, 10) == 2
+    assert reopened.leftover_parts() == [3]
+
+
+def test_acknowledge_waits_for_a_resumable_position(checkpoint_dir):
+    checkpoint = open_checkpoint()
+    checkpoint.bind(7, 42)
+    mid_group = checkpoint.allocate(0, None, 5)
+    checkpoint.acknowledge(mid_group)
+    assert checkpoint.resume_positions() == {}
+    
+    end_of_group = checkpoint.allocate(0, {"key": "a"}, 5)
+    checkpoint.acknowledge(end_of_group)
+    assert checkpoint.resume_positions() == {0: {"key": "a"}}
+    assert checkpoint.rows_done() == 10
+
+
+def test_other_identity_starts_fresh(checkpoint_dir):
+    open_checkpoint().bind(7, 42)
+    assert open_checkpoint("WHERE y").execution_id is None
+
+
+def test_discard_removes_the_file(checkpoint_dir):
+    checkpoint = open_checkpoint()
+    checkpoint.bind(7, 42)
+    checkpoint.discard()
+    assert os.listdir(checkpoint_dir) == []
+
+
+def age(checkpoint, seconds):
+    then = time.time() - seconds
+    os.utime(checkpoint.path, (then, then))
+
+
+def test_stale_checkpoints(checkpoint_dir):
+    superseded = open_checkpoint("WHERE yesterday")
+    superseded.bind(7, 1)
+    age(superseded, app.CHECKPOINT_SUPERSEDED_SECONDS + 60)
+    
+    recent = open_checkpoint("WHERE running")
+    recent.bind(7, 2)
+    
+    other_target = open_checkpoint("WHERE yesterday", target="t2")
+    other_target.bind(8, 3)
+    age(other_target, app.CHECKPOINT_SUPERSEDED_SECONDS + 60)
+    
+    expired = open_checkpoint("WHERE long ago", target="t3")
+    expired.bind(9, 4)
+    age(expired, app.CHECKPOINT_MAX_AGE_SECONDS + 60)
+    
+    current = open_checkpoint("WHERE today")
+    current.bind(7, 5)
+    stale = {checkpoint.execution_id for checkpoint in current.stale_checkpoints()}
+    assert stale == {1, 4}
@@ -0,0 +1,60 @@
+import gzip
+
+import app
+
+
+def make_sizer(**kwargs):
+    options = dict(target_bytes=1000, target_seconds=10, min_rows=1, max_rows=10000)
+    options.update(kwargs)
+    return app.AdaptiveChunkSizer(**options)
+
+
+def test_starts_from_target_bytes_over_row_width():
+    assert make_sizer(row_bytes=10).next_size() == 100
+
+
+def test_initial_size_is_clamped():
+    assert make_sizer(row_bytes=10, max_rows=50).next_size() == 50
+    assert make_sizer(row_bytes=10000, min_rows=5).next_size() == 5
+
+
+def test_growth_is_capped_at_double():
+    sizer = make_sizer(row_bytes=10)
+    sizer.observe(100, 100)  # rows are 1 byte, so 1000 rows would hit the target
+    assert sizer.next_size() == 200
+
+
+def test_shrinks_immediately_to_the_byte_target():
+    sizer = make_sizer(row_bytes=10)
+    sizer.observe(100, 10000)
+    assert sizer.next_size() == 10
+    assert sizer.expected_bytes() == 1000
+
+
+def test_latency_target_limits_the_size():
+    sizer = make_sizer(row_bytes=10)
+    sizer.observe(100, 1000, seconds=20)
+    assert sizer.next_size() == 50
+
+
+def test_empty_responses_are_ignored():
+    sizer = make_sizer(row_bytes=10)
+    sizer.observe(0, 0)
+    assert sizer.next_size() == 100
+
+
+def test_fixed_never_adapts():
+    sizer = app.AdaptiveChunkSizer.fixed(25)
+    sizer.observe(25, 10 ** 9, seconds=1000)
+    assert sizer.next_size() == 25
+
+
+def test_sized_body_reports_uncompressed_bytes():
+    def write(handle):
+        app.write_rows_csv(handle, [[1, "x" * 100]] * 50, ["a", "b"], header=True)
+    
+    plain, plain_size = app.encode_csv_body_sized(write)
+    compressed, compressed_size = app.encode_csv_body_sized(write, compress=True)
+    assert plain_size == len(plain)
+    assert compressed_size == plain_size
+    assert gzip.decompress(compressed) == plain
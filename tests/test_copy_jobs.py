@@ -0,0 +1,53 @@
+from datetime import date
+
+import app
+
+
+def copy_args(**overrides):
+    args = {
+        "source_dataset_id": "s1",
+        "target_dataset_name": "Sales (Dev)",
+        "target_dataset": None,
+        "date_column": "Date",
+        "start_date": date(2024, 1, 1),
+        "end_date": date(2024, 1, 31),
+        "delta": False,
+        "replace_range": False,
+        "force": False,
+    }
+    args.update(overrides)
+    return args
+
+
+def test_same_copy_shares_a_key():
+    assert app.copy_job_key(copy_args()) == app.copy_job_key(copy_args())
+
+
+def test_new_target_name_is_case_insensitive():
+    assert app.copy_job_key(copy_args()) == app.copy_job_key(copy_args(target_dataset_name="sales (dev)"))
+
+
+def test_existing_target_is_keyed_by_id():
+    first = copy_args(target_dataset={"id": "t1"}, target_dataset_name="Old name")
+    second = copy_args(target_dataset={"id": "t1"}, target_dataset_name="New name")
+    assert app.copy_job_key(first) == app.copy_job_key(second)
+    assert app.copy_job_key(first) != app.copy_job_key(copy_args(target_dataset={"id": "t2"}))
+
+
+def test_any_filter_or_mode_change_is_a_different_copy():
+    base = app.copy_job_key(copy_args())
+    for change in [
+        {"source_dataset_id": "s2"},
+        {"date_column": "Created"},
+        {"start_date": date(2024, 1, 2)},
+        {"end_date": None},
+        {"delta": True},
+        {"replace_range": True},
+        {"force": True},
+    ]:
+        assert app.copy_job_key(copy_args(**change)) != base, change
+
+
+def test_forced_copy_does_not_attach_to_an_unforced_one():
+    # The unforced job may finish as up to date without copying anything
+    assert app.copy_job_key(copy_args(force=True)) != app.copy_job_key(copy_args())
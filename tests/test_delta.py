@@ -0,0 +1,70 @@
+import csv
+import gzip
+import io
+import sqlite3
+
+import pytest
+
+import app
+
+COLUMNS = ["id", "Date"]
+SCHEMA = [{"name": "id", "type": "LONG"}, {"name": "Date", "type": "DATE"}]
+DEV_ROWS = [(1, "2024-01-01"), (2, "2024-01-02"), (3, "2024-01-03")]
+NEW_ROWS = [(4, "2024-01-04"), (5, "2024-01-05"), (6, "2024-01-05")]
+
+
+def make_db(rows):
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.execute("CREATE TABLE t (id INTEGER, Date TEXT)")
+    db.executemany("INSERT INTO t VALUES (?, ?)", rows)
+    return db
+
+
+@pytest.fixture
+def instances(tmp_path, monkeypatch):
+    # Prod has a late row for a day dev already holds; a delta leaves it for a range replace
+    dbs = {app.PROD_INSTANCE: make_db(DEV_ROWS + [(7, "2024-01-03")] + NEW_ROWS), app.DEV_INSTANCE: make_db(DEV_ROWS)}
+    uploads = {"methods": [], "parts": {}, "queries": []}
+
+    def query(instance, sql):
+        uploads["queries"].append((instance, sql))
+        return [list(row) for row in dbs[instance].execute(sql.replace("FROM table", "FROM t"))]
+
+    def upload_stream_part(instance, stream_id, execution_id, part_num, csv_data, compressed=False):
+        text = (gzip.decompress(csv_data) if compressed else csv_data).decode()
+        uploads["parts"][part_num] = list(csv.reader(io.StringIO(text)))
+
+    def create_stream_execution(instance, stream_id, update_method="REPLACE"):
+        uploads["methods"].append(update_method)
+        return 42
+
+    monkeypatch.setattr(app, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(app, "get_extract_cache", lambda: app.ExtractCache(str(tmp_path / "extracts")))
+    monkeypatch.setattr(app, "get_dataset_catalog", lambda: app.DatasetCatalog(str(tmp_path / "catalog.sqlite")))
+    monkeypatch.setattr(app, "get_dataset_info", lambda instance, dataset_id: {
+        "rows": len(query(instance, "SELECT * FROM table")), "updatedAt": "u1", "schema": {"columns": SCHEMA}
+    })
+    monkeypatch.setattr(app, "execute_query", lambda instance, dataset_id, sql, timeout=None: {"rows": query(instance, sql)})
+    monkeypatch.setattr(app, "fetch_query_rows", lambda instance, dataset_id, sql, sizer=None: (COLUMNS, query(instance, sql)))
+    monkeypatch.setattr(app, "get_or_create_stream", lambda instance, dataset_id: 7)
+    monkeypatch.setattr(app, "create_stream_execution", create_stream_execution)
+    monkeypatch.setattr(app, "upload_stream_part", upload_stream_part)
+    monkeypatch.setattr(app, "commit_stream_execution", lambda instance, stream_id, execution_id: None)
+    monkeypatch.setattr(app, "get_stream_execution_state", lambda instance, stream_id, execution_id: "ACTIVE")
+    return uploads
+
+
+def test_delta_appends_only_rows_newer_than_dev(instances):
+    result = app.copy_dataset_to_dev(
+        "s1", "Sales (Dev)", date_column="Date", target_dataset={"id": "t1"}, delta=True
+    )
+
+    assert result["mode"] == "delta"
+    assert result["rows"] == len(NEW_ROWS)
+    assert instances["methods"] == ["APPEND"]
+    uploaded = [row for part in sorted(instances["parts"]) for row in instances["parts"][part]]
+    assert uploaded[0] == COLUMNS
+    assert sorted(tuple(row) for row in uploaded[1:]) == [(str(i), day) for i, day in NEW_ROWS]
+    # Nothing is read back out of dev apart from its watermark
+    dev_queries = [sql for instance, sql in instances["queries"] if instance == app.DEV_INSTANCE]
+    assert all("MAX(" in sql for sql in dev_queries)
@@ -0,0 +1,91 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import app
+
+SCHEMA = [
+    {"name": "id", "type": "LONG"},
+    {"name": "amount", "type": "DOUBLE"},
+    {"name": "name", "type": "STRING"},
+]
+ROWS = 5000
+
+
+def csv_body(header=True):
+    lines = ["id,amount,name"] if header else []
+    lines += [f"{i},{i / 4},row {i}" for i in range(ROWS)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.fixture
+def server():
+    served = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = served["body"]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            if served["chunked"]:
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(body), 4096):
+                    piece = body[start:start + 4096]
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield served, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def export(server, monkeypatch):
+    served, base_url = server
+    session = requests.Session()
+
+    def get(url, **kwargs):
+        return requests.Session.get(session, url.replace("https://api.domo.com", base_url), **kwargs)
+
+    session.get = get
+    monkeypatch.setattr(app, "get_http_session", lambda instance: session)
+    monkeypatch.setattr(app, "get_dataset_info", lambda instance, dataset_id: {
+        "rows": ROWS, "schema": {"columns": SCHEMA}
+    })
+
+    def run(body, chunked=False):
+        served.update(body=body, chunked=chunked)
+        return app.export_dataset_data("prod", "ds")
+
+    return run
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+@pytest.mark.parametrize("header", [True, False])
+def test_small_dataset_streams_the_csv_export(export, chunked, header):
+    df = export(csv_body(header), chunked=chunked)
+    assert list(df.columns) == ["id", "amount", "name"]
+    assert len(df) == ROWS
+    assert df.dtypes.to_dict() == app.schema_dtypes(SCHEMA) | {"name": df["name"].dtype}
+    assert df["id"].iloc[-1] == ROWS - 1
+    assert df["amount"].iloc[-1] == (ROWS - 1) / 4
+
+
+def test_empty_export_returns_the_schema_columns(export):
+    df = export(b"")
+    assert list(df.columns) == ["id", "amount", "name"]
+    assert df.empty
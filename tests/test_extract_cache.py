@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import app
+
+COLUMNS = ["id", "name"]
+
+
+def chunks(rows, size=50):
+    for offset in range(0, rows, size):
+        yield offset, COLUMNS, [[i, f"row {i}"] for i in range(offset, min(offset + size, rows))], (0, None)
+
+
+def capture(cache, key, rows, expected_bytes=0):
+    return sum(len(chunk[2]) for chunk in cache.capture(key, COLUMNS, chunks(rows), expected_bytes=expected_bytes))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = app.ExtractCache(str(tmp_path), max_bytes=1 << 20)
+    capture(cache, "small", 1)
+    capture(cache, "other", 1)
+    assert cache.get("small") and cache.get("other")
+    # Room for exactly two one-row entries
+    cache.max_bytes = 2 * os.path.getsize(cache._entry_path("small")) + 100
+    return cache
+
+
+def test_oversized_extract_leaves_the_cache_alone(cache):
+    assert capture(cache, "huge", 5000) == 5000
+    assert cache.get("huge") is None
+    assert cache.get("small") and cache.get("other")
+    assert sorted(os.listdir(cache.path)) == sorted(os.path.basename(cache._entry_path(key)) for key in ["small", "other"])
+
+
+def test_oversized_new_entry_is_dropped_before_evicting_others(cache):
+    path = cache._entry_path("huge")
+    with open(path, "wb") as f:
+        f.write(b"x" * (cache.max_bytes + 1))
+    cache.evict("huge")
+    assert not os.path.exists(path)
+    assert cache.get("small") and cache.get("other")
+
+
+def test_extract_expected_to_exceed_the_budget_is_not_written(cache, monkeypatch):
+    writes = []
+    monkeypatch.setattr(app.os, "replace", lambda *args: writes.append(args))
+    assert capture(cache, "huge", 10, expected_bytes=cache.max_bytes + 1) == 10
+    assert not writes
+    assert not [name for name in os.listdir(cache.path) if name.endswith(".tmp")]
+
+
+def test_a_new_entry_that_fits_evicts_the_least_recently_used(cache):
+    os.utime(cache._entry_path("small"), (1, 1))
+    capture(cache, "new", 1)
+    assert cache.get("small") is None
+    assert cache.get("other") and cache.get("new")
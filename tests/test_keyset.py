@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+import app
+
+COLUMNS = ["k", "v"]
+ROWS = [(1, "a"), (2, "b"), (2, "c"), (2, "d"), (2, "e"), (3, "f"), (None, "g"), (4, "h"), (None, "i"), (4, "j")]
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.execute("CREATE TABLE t (k INTEGER, v TEXT)")
+    db.executemany("INSERT INTO t VALUES (?, ?)", ROWS)
+    seen = []
+
+    def fetch_query_rows(instance, dataset_id, sql, sizer=None):
+        seen.append(sql)
+        return COLUMNS, [list(row) for row in db.execute(sql.replace("FROM table", "FROM t"))]
+
+    monkeypatch.setattr(app, "fetch_query_rows", fetch_query_rows)
+    return seen
+
+
+def extract(size, resume_from=None):
+    return list(app.iter_keyset_chunks(
+        "prod", "ds", "", "k", COLUMNS, sizer=app.AdaptiveChunkSizer.fixed(size), resume_from=resume_from
+    ))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 20])
+def test_every_row_once_across_tie_groups_and_nulls(queries, size):
+    rows = [tuple(row) for chunk in extract(size) for row in chunk[2]]
+    assert sorted(rows, key=repr) == sorted(ROWS, key=repr)
+
+
+def test_pages_order_by_the_key_only(queries):
+    extract(3)
+    pages = [sql for sql in queries if "OFFSET" not in sql]
+    assert pages and all(sql.endswith("ORDER BY `k` LIMIT 3") for sql in pages)
+
+
+def test_tie_groups_and_nulls_are_paged_in_full_column_order(queries):
+    extract(3)
+    groups = [sql for sql in queries if "OFFSET" in sql]
+    assert any("`k` = 2" in sql and "OFFSET 0" in sql for sql in groups)
+    assert any("`k` IS NULL" in sql for sql in groups)
+    assert all("ORDER BY `v` LIMIT" in sql for sql in groups)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3])
+def test_resumes_after_any_position(queries, size):
+    chunks = extract(size)
+    for i, (_, _, _, (_, position)) in enumerate(chunks):
+        before = [tuple(row) for chunk in chunks[:i + 1] for row in chunk[2]]
+        after = [tuple(row) for chunk in extract(size, resume_from=position) for row in chunk[2]]
+        assert sorted(before + after, key=repr) == sorted(ROWS, key=repr)
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+import app
+
+DAYS = {"2024-01-01": 5, "2024-01-02": 1, "2024-01-03": 4, "2024-01-04": 2, "2024-01-05": 6}
+
+
+@pytest.fixture
+def dataset(monkeypatch):
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.execute("CREATE TABLE t (d TEXT)")
+    db.executemany("INSERT INTO t VALUES (?)", [(day,) for day, cnt in DAYS.items() for _ in range(cnt)])
+    db.executemany("INSERT INTO t VALUES (?)", [(None,), (None,)])
+
+    def execute_query(instance, dataset_id, sql, timeout=None):
+        return {"rows": [list(row) for row in db.execute(sql.replace("FROM table", "FROM t"))]}
+
+    monkeypatch.setattr(app, "execute_query", execute_query)
+    monkeypatch.setattr(app, "get_instance_concurrency", lambda instance: 1)
+    return db
+
+
+def count(db, where_clause):
+    return db.execute(f"SELECT COUNT(*) FROM t {where_clause}").fetchone()[0]
+
+
+def test_partitions_cover_the_filter_exactly_once(dataset):
+    where_clause = "WHERE `d` >= '2024-01-01'"
+    partitions, total_rows = app.plan_date_partitions("prod", "ds", "d", where_clause, chunk_size=5)
+    assert total_rows == sum(DAYS.values())
+    assert len(partitions) > 1
+    assert [estimate for _, estimate in partitions] == [count(dataset, where) for where, _ in partitions]
+    assert sum(estimate for _, estimate in partitions) == count(dataset, where_clause)
+    assert all(where.startswith(where_clause) for where, _ in partitions)
+
+
+def test_partitions_never_exceed_the_target_unless_one_day_does(dataset):
+    partitions, _ = app.plan_date_partitions("prod", "ds", "d", "WHERE `d` IS NOT NULL", chunk_size=6)
+    assert [estimate for _, estimate in partitions] == [6, 6, 6]
+
+
+def test_small_extract_stays_one_partition(dataset):
+    where_clause = "WHERE `d` IS NOT NULL"
+    partitions, total_rows = app.plan_date_partitions("prod", "ds", "d", where_clause, chunk_size=100)
+    assert partitions == [(where_clause, total_rows)]
+
+
+def test_failed_probe_returns_no_plan(monkeypatch):
+    def execute_query(instance, dataset_id, sql, timeout=None):
+        raise Exception("query failed")
+
+    monkeypatch.setattr(app, "execute_query", execute_query)
+    assert app.plan_date_partitions("prod", "ds", "d", "WHERE x") == (None, None)
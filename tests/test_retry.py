@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+def response(retry_after=None):
+    return SimpleNamespace(headers={"Retry-After": retry_after} if retry_after is not None else {})
+
+
+def test_retry_after_seconds():
+    assert app.parse_retry_after(response("7")) == 7.0
+    assert app.parse_retry_after(response("-3")) == 0.0
+
+
+def test_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= app.parse_retry_after(response(format_datetime(when, usegmt=True))) <= 30
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert app.parse_retry_after(response(format_datetime(past, usegmt=True))) == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_retry_after_missing_or_unparseable(value):
+    assert app.parse_retry_after(response(value)) is None
+
+
+def test_retry_delay_is_jittered_exponential_backoff(monkeypatch):
+    monkeypatch.setattr(app.random, "uniform", lambda low, high: high)
+    assert app.retry_delay(0) == app.RETRY_BASE_DELAY_SECONDS
+    assert app.retry_delay(3) == app.RETRY_BASE_DELAY_SECONDS * 8
+    assert app.retry_delay(30) == app.RETRY_MAX_DELAY_SECONDS
+    monkeypatch.setattr(app.random, "uniform", lambda low, high: low)
+    assert app.retry_delay(3) == 0
+
+
+def test_retry_delay_honours_retry_after_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(app.random, "uniform", lambda low, high: low)
+    assert app.retry_delay(0, retry_after=12.5) == 12.5
+    assert app.retry_delay(0, retry_after=app.RETRY_MAX_DELAY_SECONDS * 10) == app.RETRY_MAX_DELAY_SECONDS